@@ -1,87 +1,150 @@
+import time
+import_start = time.perf_counter()
+
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
-import plotly.graph_objects as go
 import os
-import google.generativeai as genai
-from dotenv import load_dotenv
-from pypdf import PdfReader
+
+from catalog import Catalog, dataset_version
+from figures import FIGURES, MAX_POINTS
+from neighbors import NEIGHBORS_FILE, load_index
+from llm import MODEL_NAME, ResponseCache, stream_profile, stream_text
+from metrics import METRICS, timer
+from papers import update_index, papers_version, format_context
+from storage import load_dataset, dataset_exists, csv_path, memory_mb
+
+import_seconds = time.perf_counter() - import_start
 
 
-load_dotenv()
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+# The script body runs again on every rerun, where the imports are already
+# loaded; only the first run of the server process is a cold start.
+@st.cache_resource(show_spinner=False)
+def record_cold_start():
+    METRICS.observe("app.import", import_seconds)
 
-if GOOGLE_API_KEY:
-    try:
-        genai.configure(api_key=GOOGLE_API_KEY)
-    except Exception as e:
-        pass
+
+record_cold_start()
 
 st.set_page_config(page_title="AstroBiom. Scientific Dashboard", page_icon="🪐", layout="wide")
+rerun_start = time.perf_counter()
 
+PAPER_TOP_K = 6
+TARGET_MATCHES = 20
 
-@st.cache_data
 
-def load_papers_text():
-    text_content = ""
-    pdf_files = [
-        "papers/adams_2025.pdf", 
-        "papers/kiang_2007.pdf", 
-        "papers/schulze_makuchl_2020.pdf"
-    ]
-    
-    for file_path in pdf_files:
-        if os.path.exists(file_path):
-            try:
-                reader = PdfReader(file_path)
-                text_content += f"\n\n--- START OF DOCUMENT: {file_path} ---\n"
+# The Gemini SDK takes about a second to import, so it is loaded, configured
+# and cached on the first AI request instead of on every server start.
+@st.cache_resource
+def google_api_key():
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    return os.getenv("GOOGLE_API_KEY")
+
+
+# one client for all sessions instead of a new GenerativeModel per click
+@st.cache_resource
+def get_model():
+    import google.generativeai as genai
+
+    genai.configure(api_key=google_api_key())
+    return genai.GenerativeModel(MODEL_NAME)
 
-                for page in reader.pages:
-                    text_content += page.extract_text() + "\n"
-                text_content += f"\n--- END OF DOCUMENT: {file_path} ---\n"
-            except Exception as e:
-                st.error(f"Error reading {file_path}: {e}")
-    
-    return text_content
+
+# shared by every session (and the batch pre-generation job, through the file)
+@st.cache_resource
+def get_response_cache():
+    return ResponseCache()
+
+
+# saved by data_ml.py next to the cluster model
+@st.cache_resource(max_entries=2)
+def load_neighbor_index(version):
+    return load_index(NEIGHBORS_FILE)
+
+
+# rebuilt (incrementally) only when a PDF in papers/ changes
+@st.cache_resource(max_entries=2)
+def load_paper_index(version):
+    return update_index()
+
+
+def data_path():
+    path_final = "data/astrobiom_final.parquet"
+    path_processed = "data/astrobiom_processed.parquet"
+    for path in (path_final, path_processed):
+        # load_dataset falls back to the CSV copy by itself
+        if dataset_exists(path):
+            return path
+    return None
+
+
+# one catalog per dataset version, shared read-only by every session;
+# rewriting the file changes the version and loads the new data
+@st.cache_resource(max_entries=2)
+def load_catalog(path, version):
+    with timer("app.load_data") as t:
+        catalog = Catalog(load_dataset(path), version)
+        t["rows"] = len(catalog)
+    return catalog
 
 
 def load_data():
-    path_final = "data/astrobiom_final.csv"
-    path_processed = "data/astrobiom_processed.csv"
-    if os.path.exists(path_final):
-        return pd.read_csv(path_final)
-    elif os.path.exists(path_processed):
-        st.warning("⚠️ astrobiom_final.csv not found")
-        return pd.read_csv(path_processed)
-    else:
+    path = data_path()
+    if path is None:
         return None
+    if "astrobiom_processed" in path:
+        st.warning("⚠️ astrobiom_final dataset not found")
+    source = path if os.path.exists(path) else csv_path(path)
+    return load_catalog(path, dataset_version(source))
+
+# figures depend only on the dataset version and the filter state
+@st.cache_resource(max_entries=64)
+def theory_figure(kind, version, selected_types, hz_only, lod, _df):
+    with timer("app.figure", rows=len(_df), kind=kind, lod=lod):
+        return FIGURES[kind](_df, lod=lod)
 
-st.cache_data.clear()
-df = load_data()
+catalog = load_data()
+df = catalog.df if catalog is not None else None
 
 
 st.sidebar.header("Filters")
 
 if df is not None:
     # 1. main filter
+    selected_types = None
     if 'Planet_Type_ML' in df.columns:
         st.sidebar.subheader("1. Type filter (ML)")
-        all_types = df['Planet_Type_ML'].unique()
+        all_types = catalog.categories('Planet_Type_ML')
         selected_types = st.sidebar.multiselect(
             label="Planets to display", 
             options=all_types, 
             default=all_types
         )
-        df_filtered = df[df['Planet_Type_ML'].isin(selected_types)]
-    else:
-        df_filtered = df.copy()
 
     # 2. habitable filter
     st.sidebar.subheader("2. Habitable Zone filter")
     hz_only = st.sidebar.checkbox("Show only planets in the Habitable Zone (Hide too hot/cold)", value=False)
-    
-    if hz_only and 'habitable_type' in df_filtered.columns:
-        df_filtered = df_filtered[df_filtered['habitable_type'] == "Habitable Zone (Goldilocks)"]
+
+    # index intersection instead of scanning the frame
+    with timer("app.filter") as t:
+        rows = catalog.select(
+            Planet_Type_ML=selected_types,
+            habitable_type=["Habitable Zone (Goldilocks)"] if hz_only else None
+        )
+        df_filtered = catalog.frame(rows)
+        t["rows"] = len(df_filtered)
+
+    # 3. plot detail for large samples
+    lod = "sample"
+    if len(df_filtered) > MAX_POINTS:
+        st.sidebar.subheader("3. Plot detail")
+        lod_label = st.sidebar.radio("Large samples", ["Sample points", "Density map"])
+        lod = "density" if lod_label == "Density map" else "sample"
+
+    figure_key = (catalog.version, tuple(selected_types) if selected_types is not None else None, hz_only, lod)
 
     st.sidebar.divider()
     st.sidebar.markdown(f"**Total planets:** {len(df)}")
@@ -91,7 +154,7 @@ if df is not None:
         st.sidebar.warning("⚠️ No planets visible! Disable your filters.")
     
     if 'AstroBiom_Score' in df_filtered.columns and not df_filtered.empty:
-        best_planet = df_filtered.sort_values(by='AstroBiom_Score', ascending=False).iloc[0]
+        best_planet = df.iloc[catalog.top_k(rows, 1)[0]]
         st.sidebar.success(f"Sample Leader\n**{best_planet['pl_name']}**\n(Score: {best_planet['AstroBiom_Score']:.1f})")
 else:
     st.error("Data not loaded")
@@ -101,14 +164,15 @@ else:
 st.title("AstroBiom. Habitability analysis")
 st.markdown("Step-by-step exploration of exoplanets based on three scientific theories.")
 
-tab0, tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
+tab0, tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
     "0. About",
     "1. Theory A. Biology (Schulze-Makuch)", 
     "2. Theory B. Atmosphere (Zahnle)", 
     "3. Theory C. Rotation Dynamics (Adams)", 
     "4. Connection with ML",
     "5. AI Astrobiologist",
-    "6. AI with pappers"
+    "6. AI with pappers",
+    "7. Similar planets"
 ])
 
 
@@ -156,23 +220,7 @@ with tab1:
     st.markdown("**Hypothesis.** Life depends on temperature conditions.")
     
     if 'pl_eqt' in df_filtered.columns and 'insolation' in df_filtered.columns:
-        df_plot = df_filtered.copy()
-        df_plot['temp_c'] = df_plot['pl_eqt'] - 273.15
-        color_map = {"Complex Life Possible": "green", "Microbial Life Only": "orange", "Extreme Environment": "red", "Unknown": "gray"}
-        
-        fig_bio = px.scatter(
-            df_plot, x="insolation", y="temp_c", color="Bio_Class",
-            color_discrete_map=color_map, log_x=True,
-            hover_name="pl_name", 
-            hover_data={"insolation": True, "temp_c": ":.1f", "Bio_Class": True},
-            title="Insolation vs Surface Temperature (°C)"
-        )
-        fig_bio.update_yaxes(range=[-150, 400])
-        fig_bio.add_hline(y=-18, line_dash="dash", line_color="blue", annotation_text="-18°C")
-        fig_bio.add_hline(y=105, line_dash="dash", line_color="green", annotation_text="+105°C")
-        fig_bio.add_hline(y=122, line_dash="dash", line_color="orange", annotation_text="+122°C")
-
-        st.plotly_chart(fig_bio, use_container_width=True) 
+        st.plotly_chart(theory_figure("bio", *figure_key, _df=df_filtered), use_container_width=True) 
 
 # THEORY B: ATMOSPHERE
 with tab2:
@@ -180,16 +228,7 @@ with tab2:
     st.markdown("**Hypothesis.** Planets below the red line lose their atmosphere.")
     
     if 'insolation' in df.columns and 'v_esc' in df.columns:
-        fig_atm = px.scatter(
-            df_filtered, x="insolation", y="v_esc", color="Atmosphere_Class",
-            log_x=True, log_y=True, hover_name="pl_name",
-            title="Insolation vs Escape Velocity",
-            color_discrete_map={"Atmosphere Likely": "green", "Atmosphere Risk (Erosion)": "orange", "No Atmosphere (Likely)": "red"}
-        )
-        x_line = [0.1, 1, 10, 100, 1000, 10000]
-        y_line = [6 * (i**0.25) for i in x_line]
-        fig_atm.add_trace(go.Scatter(x=x_line, y=y_line, mode='lines', name='Limit', line=dict(color='red', dash='dash')))
-        st.plotly_chart(fig_atm, use_container_width=True)
+        st.plotly_chart(theory_figure("atmosphere", *figure_key, _df=df_filtered), use_container_width=True)
 
 # THEORY C: DYNAMICS
 with tab3:
@@ -197,16 +236,7 @@ with tab3:
     st.markdown("**Hypothesis.** Fast rotation (< 20 days) stabilizes the climate.")
     
     if 'pl_orbper' in df_filtered.columns and 'pl_eqt' in df_filtered.columns:
-        fig_adams = px.scatter(
-            df_filtered, x="pl_orbper", y="pl_eqt", color="Adams_Category",
-            hover_name="pl_name", hover_data=["AstroBiom_Score"], 
-            title="Rotation Period vs Temperature",
-            color_discrete_map={"Prime Habitability (Adams 2025)": "green", "Habitable (Fast Rotator)": "blue", "Marginal (Slow Rotator)": "gray", "Not Habitable": "red"}
-        )
-        fig_adams.update_xaxes(range=[0, 50])
-        fig_adams.update_yaxes(range=[-100, 200])
-        fig_adams.add_shape(type="rect", x0=0, y0=0, x1=20, y1=100, line=dict(color="green", width=2), fillcolor="green", opacity=0.1)
-        st.plotly_chart(fig_adams, use_container_width=True)
+        st.plotly_chart(theory_figure("adams", *figure_key, _df=df_filtered), use_container_width=True)
 
 # ML 
 with tab4:
@@ -220,26 +250,27 @@ with tab4:
     
     if 'AstroBiom_Score' in df_filtered.columns and 'Planet_Type_ML' in df_filtered.columns:
 
-        score_stats = df_filtered.groupby('Planet_Type_ML')['AstroBiom_Score'].mean().reset_index()
+        with timer("app.figure", rows=len(df_filtered), kind="ml"):
+            score_stats = df_filtered.groupby('Planet_Type_ML')['AstroBiom_Score'].mean().reset_index()
         
 
-        score_stats = score_stats.sort_values(by='AstroBiom_Score', ascending=False)
+            score_stats = score_stats.sort_values(by='AstroBiom_Score', ascending=False)
         
-        # Bar Chart
-        fig_bar = px.bar(
-            score_stats, 
-            x='Planet_Type_ML', 
-            y='AstroBiom_Score', 
-            color='AstroBiom_Score',
-            color_continuous_scale='Viridis', 
-            text_auto='.1f', 
-            title="Average AstroBiom Score by Planet Type (ML Clusters)",
+            # Bar Chart
+            fig_bar = px.bar(
+                score_stats, 
+                x='Planet_Type_ML', 
+                y='AstroBiom_Score', 
+                color='AstroBiom_Score',
+                color_continuous_scale='Viridis', 
+                text_auto='.1f', 
+                title="Average AstroBiom Score by Planet Type (ML Clusters)",
             
-            labels={
-                'AstroBiom_Score': 'Average AstroBiom Score',  # <--- ТУТ
-                'Planet_Type_ML': 'ML Cluster'
-            }
-        )
+                labels={
+                    'AstroBiom_Score': 'Average AstroBiom Score',  # <--- ТУТ
+                    'Planet_Type_ML': 'ML Cluster'
+                }
+            )
         
         fig_bar.update_layout(xaxis_title=None) 
         
@@ -267,7 +298,7 @@ with tab5:
     st.header("AI Astrobiologist")
     st.markdown(" Select a planet, and the AI will generate its scientific profile.")
     
-    top_candidates = df_filtered.sort_values(by='AstroBiom_Score', ascending=False).head(50)
+    top_candidates = catalog.frame(catalog.top_k(rows, 50))
     
     col_sel, col_btn = st.columns([3, 1])
     with col_sel:
@@ -278,36 +309,16 @@ with tab5:
         generate_btn = st.button("Analyse")
 
     if generate_btn:
-        if not GOOGLE_API_KEY:
+        if not google_api_key():
              st.error("API not found")
         else:
-            planet_data = df[df['pl_name'] == planet_name].iloc[0]
-            
-
-            prompt = f"""
-            You are an expert astrobiologist. Describe the exoplanet {planet_name}.
-            AstroBiom data:
-            - Mass: {planet_data.get('pl_bmasse', 'N/A')} M_earth
-            - Radius: {planet_data.get('pl_rade', 'N/A')} R_earth
-            - Temperature: {planet_data.get('pl_eqt', 'N/A')} K
-            - Orbital Period: {planet_data.get('pl_orbper', 'N/A')} d
-            - ESI: {planet_data.get('ESI', 0):.2f}
-            - AstroBiom Score: {planet_data.get('AstroBiom_Score', 0):.1f}
-            - Category (Adams): {planet_data.get('Adams_Category', 'N/A')}
-            - Type (ML): {planet_data.get('Planet_Type_ML', 'N/A')}
-
-            1. Is it habitable?
-            2. Role of rotation (according to Adams).
-            3. Conclusion. Use emojis.
-            """
+            planet_data = catalog.lookup(planet_name)
             
-            with st.spinner('Thinking...'):
-                try:
-                    model = genai.GenerativeModel('gemini-2.5-flash')
-                    response = model.generate_content(prompt)
-                    st.write(response.text)
-                except Exception as e:
-                    st.error(f"Error: {e}")
+            try:
+                with timer("app.llm", kind="profile"):
+                    st.write_stream(stream_profile(get_model(), planet_name, planet_data, cache=get_response_cache()))
+            except Exception as e:
+                st.error(f"Error: {e}")
 
 
 
@@ -317,9 +328,10 @@ with tab6:
     st.markdown("Ask questions specifically about the scientific papers used in this project.")
 
 
-    knowledge_base = load_papers_text()
-    
-    if not knowledge_base:
+    # the index is loaded (and changed PDFs re-extracted) on the first question
+    paper_files = papers_version()
+
+    if not paper_files:
         st.warning("⚠️ PDF files not found")
     else:
 
@@ -336,31 +348,90 @@ with tab6:
                 st.markdown(prompt)
 
 
-            if not GOOGLE_API_KEY:
+            if not google_api_key():
                 st.error("API Key not found")
             else:
                 with st.chat_message("assistant"):
-                    with st.spinner("Analyzing scientific papers..."):
-                        try:
-
-                            full_prompt = f"""
-                            You are a research assistant for a diploma project.
-                            You have read the following academic papers:
-                            {knowledge_base}
-                            
-                            User Question: {prompt}
-                            
-                            Instructions:
-                            1. Answer ONLY using the provided text.
-                            2. Cite the specific paper (Adams, Kiang, or Schulze-Makuch) for each fact.
-                            3. If the answer is not in the papers, state that clearly.
-                            """
-                            
-                            model = genai.GenerativeModel('gemini-2.5-flash')
-                            response = model.generate_content(full_prompt)
-                            
-                            st.markdown(response.text)
-                            st.session_state.messages.append({"role": "assistant", "content": response.text})
-                            
-                        except Exception as e:
-                            st.error(f"Error: {e}")
\ No newline at end of file
+                    try:
+                        # only the most relevant excerpts go into the prompt
+                        paper_index = load_paper_index(paper_files)
+                        excerpts = format_context(paper_index.search(prompt, k=PAPER_TOP_K))
+
+                        full_prompt = f"""
+                        You are a research assistant for a diploma project.
+                        Here are excerpts from the academic papers, each with its source and page:
+                        {excerpts}
+                        
+                        User Question: {prompt}
+                        
+                        Instructions:
+                        1. Answer ONLY using the provided excerpts.
+                        2. Cite the source and page (e.g. [1] kiang_2007.pdf, p. 4) for each fact.
+                        3. If the answer is not in the excerpts, state that clearly.
+                        """
+                        
+                        with timer("app.llm", kind="chat"):
+                            answer = st.write_stream(stream_text(get_model(), full_prompt))
+                        st.session_state.messages.append({"role": "assistant", "content": answer})
+                        
+                    except Exception as e:
+                        st.error(f"Error: {e}")
+
+
+
+# SIMILAR PLANETS
+with tab7:
+    st.header("Planets like this")
+    st.markdown("Nearest neighbours in the standardized Mass / Radius / Density / Temperature space used by the K-Means model.")
+
+    # the names are searched in the catalog, so the browser only gets the
+    # matches and sklearn / the index load only once a target is chosen
+    col_target, col_k = st.columns([3, 1])
+    with col_target:
+        query = st.text_input("Target planet:", placeholder="Name or part of it, e.g. TRAPPIST-1")
+    with col_k:
+        k = st.number_input("Neighbours", min_value=1, max_value=100, value=10)
+
+    matches = catalog.search(query, limit=TARGET_MATCHES) if query else []
+    if not query:
+        st.info("Type a planet name to find its neighbours.")
+    elif not matches:
+        st.info("No planet matches this name.")
+    else:
+        target = st.selectbox("Matches:", matches)
+        neighbor_index = load_neighbor_index(dataset_version(NEIGHBORS_FILE)) if os.path.exists(NEIGHBORS_FILE) else None
+
+        if neighbor_index is None:
+            st.warning("⚠️ Neighbour index not found. Run data_ml.py first.")
+        elif target not in neighbor_index.positions:
+            st.info(f"{target} lacks one of Mass / Radius / Density / Temperature, so it has no neighbours.")
+        else:
+            col_hz, col_type = st.columns(2)
+            with col_hz:
+                hz_filter = st.multiselect("Habitable zone", sorted(set(neighbor_index.labels.get('habitable_type', []))))
+            with col_type:
+                type_filter = st.multiselect("Planet type (ML)", sorted(set(neighbor_index.labels.get('Planet_Type_ML', [])) - {None}, key=str))
+
+            similar = neighbor_index.nearest(target, k=int(k), habitable_type=hz_filter, Planet_Type_ML=type_filter)
+            similar = [item for item in similar if item['pl_name'] in catalog.positions]
+            if not similar:
+                st.info("No planets match these filters.")
+            else:
+                similar_rows = np.array([catalog.positions[item['pl_name']] for item in similar], dtype=int)
+                table = catalog.frame(similar_rows)[['pl_name', 'pl_bmasse', 'pl_rade', 'pl_eqt', 'habitable_type', 'Planet_Type_ML', 'AstroBiom_Score']]
+                table.insert(1, 'distance', [item['distance'] for item in similar])
+                st.dataframe(table, hide_index=True, use_container_width=True)
+
+
+# DEBUG PANEL (hidden: open the app with ?debug=1)
+METRICS.observe("app.rerun", time.perf_counter() - rerun_start)
+
+if st.query_params.get("debug") == "1":
+    with st.sidebar.expander("Debug: metrics (this server process)", expanded=True):
+        # one compact catalog is shared by every session of the server
+        st.caption(f"Catalog in memory: {memory_mb(catalog.df):.1f} MB for {len(catalog)} planets")
+        summary = pd.DataFrame(METRICS.summary())
+        if not summary.empty:
+            st.dataframe(summary, hide_index=True, use_container_width=True)
+        st.download_button("Metrics (JSON lines)", METRICS.to_jsonl(), file_name="astrobiom_metrics.jsonl")
+        st.download_button("Metrics (Prometheus)", METRICS.to_prometheus(), file_name="astrobiom_metrics.prom")
@@ -0,0 +1,419 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from catalog import Catalog
+from data_ml import run_clustering
+from data_processor import process_data, HZ_RUNAWAY_GREENHOUSE, HZ_MAXIMUM_GREENHOUSE
+from storage import apply_schema, save_dataset, load_dataset, csv_path
+
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+RAW_FILE = os.path.join(current_dir, "data", "astrobiom_data.csv")
+RESULTS_FILE = os.path.join(current_dir, "data", "benchmark_results.json")
+APP_FILE = os.path.join(current_dir, "app.py")
+
+# a run regresses when a timing (or traced peak memory) is this many times
+# the baseline's and the absolute difference is above the noise floor
+THRESHOLDS = {
+    "seconds": {"ratio": 1.25, "min_delta": 0.05},
+    "peak_mb": {"ratio": 1.25, "min_delta": 5.0},
+}
+
+
+# Row-wise reference: the original .loc / .apply implementation of
+# process_data, run on the raw frame (recovery, row filter, physics and
+# scores), kept only to check that the vectorized engine still produces the
+# same rows and columns.
+
+def rowwise_process(df_raw):
+    df_clean = df_raw.copy()
+
+    # lum
+    mask_lum = df_clean['st_lum'].isnull() & df_clean['st_rad'].notnull() & df_clean['st_teff'].notnull()
+    df_clean.loc[mask_lum, 'st_lum'] = np.log10(
+        (df_clean.loc[mask_lum, 'st_rad']**2) * ((df_clean.loc[mask_lum, 'st_teff'] / 5778)**4)
+    )
+
+    # orb
+    mask_orbit = df_clean['pl_orbsmax'].isnull() & df_clean['pl_orbper'].notnull() & df_clean['st_mass'].notnull()
+    if mask_orbit.any():
+        P_years = df_clean.loc[mask_orbit, 'pl_orbper'] / 365.25
+        M_star = df_clean.loc[mask_orbit, 'st_mass']
+        df_clean.loc[mask_orbit, 'pl_orbsmax'] = (M_star * (P_years**2))**(1/3)
+
+    # mass
+    mask_mass = df_clean['pl_bmasse'].isnull() & df_clean['pl_rade'].notnull()
+    df_clean.loc[mask_mass, 'pl_bmasse'] = df_clean.loc[mask_mass, 'pl_rade'] ** 2.06
+
+    df_ref = df_clean.dropna(subset=['st_lum', 'pl_orbsmax', 'pl_bmasse', 'pl_rade', 'st_teff']).copy()
+
+    df_ref['pl_density'] = df_ref['pl_bmasse'] / (df_ref['pl_rade'] ** 3)
+    df_ref['insolation'] = (10 ** df_ref['st_lum']) / (df_ref['pl_orbsmax'] ** 2)
+
+    mask_no_temp = df_ref['pl_eqt'].isnull()
+    df_ref.loc[mask_no_temp, 'pl_eqt'] = df_ref.loc[mask_no_temp, 'st_teff'] * np.sqrt(
+        df_ref.loc[mask_no_temp, 'st_rad'] / (2 * df_ref.loc[mask_no_temp, 'pl_orbsmax'] * 215.032)
+    )
+
+    def hz_limit(teff, coefficients, default):
+        if pd.isna(teff): return default
+        t = min(max(teff, 2600), 7200) - 5780
+        s_sun, a, b, c, d = coefficients
+        return s_sun + t * (a + t * (b + t * (c + t * d)))
+    df_ref['hz_inner_flux'] = df_ref['st_teff'].apply(hz_limit, args=(HZ_RUNAWAY_GREENHOUSE, 1.11))
+    df_ref['hz_outer_flux'] = df_ref['st_teff'].apply(hz_limit, args=(HZ_MAXIMUM_GREENHOUSE, 0.36))
+
+    def classify_habitability(row):
+        if row['insolation'] > row['hz_inner_flux']: return "Too Hot (Hot Zone)"
+        elif row['insolation'] < row['hz_outer_flux']: return "Too Cold (Cold Zone)"
+        else: return "Habitable Zone (Goldilocks)"
+    df_ref['habitable_type'] = df_ref.apply(classify_habitability, axis=1)
+
+    def calculate_esi(radius, density, temp):
+        if pd.isna(temp): return 0
+        r_ref, d_ref, t_ref = 1.0, 1.0, 288.0
+        w_r, w_d, w_t = 0.57, 1.07, 5.58
+        esi_r = (1 - abs((radius - r_ref) / (radius + r_ref))) ** w_r
+        esi_d = (1 - abs((density - d_ref) / (density + d_ref))) ** w_d
+        esi_t = (1 - abs((temp - t_ref) / (temp + t_ref))) ** w_t
+        return (esi_r * esi_d * esi_t) ** (1/3)
+    df_ref['ESI'] = df_ref.apply(lambda row: calculate_esi(row['pl_rade'], row['pl_density'], row['pl_eqt']), axis=1)
+
+    def classify_life(temp_k):
+        if pd.isna(temp_k): return "Unknown"
+        temp_c = temp_k - 273.15
+        if -18 <= temp_c <= 105: return "Complex Life Possible"
+        elif -18 <= temp_c <= 122: return "Microbial Life Only"
+        else: return "Extreme Environment"
+    df_ref['Bio_Class'] = df_ref['pl_eqt'].apply(classify_life)
+
+    df_ref['v_esc'] = 11.186 * np.sqrt(df_ref['pl_bmasse'] / df_ref['pl_rade'])
+    def check_atmosphere(row):
+        if row['v_esc'] < 3.0: return "No Atmosphere (Likely)"
+        if row['insolation'] > (row['v_esc'] / 6.0) ** 4: return "Atmosphere Risk (Erosion)"
+        else: return "Atmosphere Likely"
+    df_ref['Atmosphere_Class'] = df_ref.apply(check_atmosphere, axis=1)
+
+    def calculate_adams_score(row):
+        score = 0.0
+        temp_c = row['pl_eqt'] - 273.15
+        if not (0 <= temp_c <= 100): return 0.0
+        score += 1.0
+        period = row['pl_orbper']
+        if pd.isna(period): return score
+        if period < 20: score += 2.0
+        else: score += 0.5
+        if 10 <= period <= 20: score += 1.0
+        return score
+    df_ref['Adams_Score'] = df_ref.apply(calculate_adams_score, axis=1)
+
+    def categorize_adams(score):
+        if score >= 4.0: return "Prime Habitability (Adams 2025)"
+        elif score >= 2.0: return "Habitable (Fast Rotator)"
+        elif score > 0: return "Marginal (Slow Rotator)"
+        else: return "Not Habitable"
+    df_ref['Adams_Category'] = df_ref['Adams_Score'].apply(categorize_adams)
+
+    df_ref['AstroBiom_Score'] = (df_ref['ESI'] * 10) + df_ref['Adams_Score']
+    return df_ref
+
+
+def resample_catalog(df_raw, n_rows, seed=42):
+    # bootstrap rows of the real archive so NaN patterns stay realistic
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(df_raw), size=n_rows)
+    return df_raw.iloc[picks].reset_index(drop=True)
+
+
+def check_equivalence(df_raw):
+    # same rows, same columns, same values; raises AssertionError otherwise
+    df_final = process_data(df_raw)
+    df_ref = rowwise_process(df_raw)
+    assert list(df_final.columns) == list(df_ref.columns), "columns differ from the row-wise reference"
+    pd.testing.assert_index_equal(df_final.index, df_ref.index)
+    for col in df_ref.columns:
+        # labels are categorical in process_data, plain strings in the reference
+        pd.testing.assert_series_equal(df_final[col].astype(df_ref[col].dtype), df_ref[col], check_dtype=False, rtol=1e-12)
+    print(f"Equivalence OK on {len(df_final)} planets.")
+
+
+# Synthetic archive. Same columns as fetch.QUERY; stellar parameters are
+# drawn per host and shared by its planets, and every measured column is
+# blanked at the rate seen in the real archive.
+
+NAN_RATES = {
+    'pl_rade': 0.254, 'pl_bmasse': 0.509, 'pl_orbper': 0.054, 'pl_orbsmax': 0.377,
+    'pl_orbeccen': 0.577, 'pl_eqt': 0.728, 'sy_dist': 0.02,
+    'st_mass': 0.125, 'st_rad': 0.129, 'st_teff': 0.116, 'st_lum': 0.763, 'st_spectype': 0.785,
+}
+STELLAR_COLUMNS = ['st_mass', 'st_rad', 'st_teff', 'st_lum', 'st_spectype', 'sy_dist']
+DISCOVERY_METHODS = {
+    'Transit': 0.74, 'Radial Velocity': 0.19, 'Microlensing': 0.043, 'Imaging': 0.015,
+    'Transit Timing Variations': 0.006, 'Eclipse Timing Variations': 0.003, 'Other': 0.003,
+}
+ERROR_PARAMETERS = ['pl_rade', 'pl_bmasse', 'pl_orbper', 'pl_orbsmax', 'pl_eqt', 'st_mass', 'st_rad', 'st_teff', 'st_lum']
+
+
+def synthetic_catalog(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+
+    # planets per host: 1 for ~70 %, a few multi-planet systems
+    sizes = rng.geometric(0.72, size=n_rows)
+    host = np.repeat(np.arange(n_rows), sizes)[:n_rows]
+    n_hosts = host[-1] + 1
+    letter = np.arange(n_rows) - np.searchsorted(host, host)
+
+    st_mass = np.exp(rng.normal(np.log(0.95), 0.35, n_hosts))
+    st_rad = st_mass ** 0.8 * np.exp(rng.normal(0, 0.25, n_hosts))
+    st_teff = np.clip(5778 * st_mass ** 0.5 * np.exp(rng.normal(0, 0.05, n_hosts)), 2500, 12000)
+    stars = {
+        'st_mass': st_mass,
+        'st_rad': st_rad,
+        'st_teff': st_teff,
+        'st_lum': np.log10(st_rad ** 2 * (st_teff / 5778) ** 4),
+        'st_spectype': pd.Series(rng.choice(list("FGKM"), n_hosts)) + rng.integers(0, 10, n_hosts).astype(str) + " V",
+        'sy_dist': np.exp(rng.normal(np.log(380), 1.1, n_hosts)),
+    }
+
+    pl_orbper = 10 ** rng.normal(1.05, 0.8, n_rows)
+    pl_rade = 10 ** rng.normal(0.4, 0.45, n_rows)
+    pl_orbsmax = (st_mass[host] * (pl_orbper / 365.25) ** 2) ** (1 / 3)
+    df = pd.DataFrame({
+        'pl_name': "SYN-" + pd.Series(host).astype(str) + " " + pd.Series(np.array(list("bcdefghijklmnopqrstuvwxyz"))[np.minimum(letter, 24)]),
+        'hostname': "SYN-" + pd.Series(host).astype(str),
+        'discoverymethod': rng.choice(list(DISCOVERY_METHODS), n_rows, p=np.array(list(DISCOVERY_METHODS.values())) / sum(DISCOVERY_METHODS.values())),
+        'disc_year': rng.integers(1995, 2026, n_rows),
+        'pl_rade': pl_rade,
+        'pl_bmasse': pl_rade ** 2.06 * np.exp(rng.normal(0, 0.5, n_rows)),
+        'pl_orbper': pl_orbper,
+        'pl_orbsmax': pl_orbsmax,
+        'pl_orbeccen': rng.beta(0.9, 6.0, n_rows),
+        'pl_eqt': st_teff[host] * np.sqrt(st_rad[host] / (2 * pl_orbsmax * 215.032)) * np.exp(rng.normal(0, 0.05, n_rows)),
+    })
+
+    for col, values in stars.items():
+        values = pd.Series(values)
+        values[rng.random(n_hosts) < NAN_RATES[col]] = None
+        df[col] = values.to_numpy()[host]
+    for col in ['pl_rade', 'pl_bmasse', 'pl_orbper', 'pl_orbsmax', 'pl_orbeccen', 'pl_eqt']:
+        df.loc[rng.random(n_rows) < NAN_RATES[col], col] = np.nan
+
+    # asymmetric error bars of 2-20 %
+    for col in ERROR_PARAMETERS:
+        scale = np.abs(df[col].to_numpy()) * rng.uniform(0.02, 0.2, n_rows)
+        df[col + 'err1'] = scale
+        df[col + 'err2'] = -scale * rng.uniform(0.7, 1.3, n_rows)
+
+    df['rowupdate'] = (np.datetime64('2014-01-01') + rng.integers(0, 4300, n_rows)).astype(str)
+    return df
+
+
+# Benchmark suite. Every case returns a callable to time; its traced peak
+# memory is recorded in the same run.
+
+def _filter_path(catalog):
+    # what one sidebar interaction does: index intersection, view, leader
+    types = catalog.categories('Planet_Type_ML')[:2]
+    rows = catalog.select(Planet_Type_ML=types, habitable_type=["Habitable Zone (Goldilocks)"])
+    catalog.frame(rows)
+    catalog.top_k(rows, 1)
+
+
+def _cases(df_raw, folder):
+    mini_batch = len(df_raw) > 1_000_000
+    df_processed = process_data(df_raw)
+    df_final, _ = run_clustering(df_processed.copy(), mini_batch=mini_batch)
+
+    # the dashboard reads Parquet, or the CSV when only that is present
+    parquet_file = os.path.join(folder, "final.parquet")
+    csv_only_file = os.path.join(folder, "csv_only.parquet")
+    save_dataset(df_final, parquet_file)
+    apply_schema(df_final).to_csv(csv_path(csv_only_file), index=False)
+    catalog = Catalog(df_final)
+
+    return {
+        "process_data": lambda: process_data(df_raw),
+        # one theory only: the evaluator skips ESI, Bio_Class and Adams
+        "process_atmosphere": lambda: process_data(df_raw, columns=['Atmosphere_Class']),
+        "run_clustering": lambda: run_clustering(df_processed.copy(), mini_batch=mini_batch),
+        "load_parquet": lambda: Catalog(load_dataset(parquet_file)),
+        "load_csv": lambda: Catalog(load_dataset(csv_only_file)),
+        "sidebar_filter": lambda: _filter_path(catalog),
+    }
+
+
+CASES = ["process_data", "process_atmosphere", "run_clustering", "load_parquet", "load_csv", "sidebar_filter"]
+
+
+def measure(fn, repeat=1):
+    # best wall time of `repeat` untraced runs, then peak memory from one
+    # more run under tracemalloc (tracing slows the code it watches)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return min(times), peak / 2**20
+
+
+def run_suite(sizes, cases=CASES, seed=0):
+    results = []
+    for n_rows in sizes:
+        df_raw = synthetic_catalog(n_rows, seed=seed)
+        with tempfile.TemporaryDirectory() as folder, contextlib.redirect_stdout(io.StringIO()):
+            suite = _cases(df_raw, folder)
+            measured = {name: measure(suite[name], repeat=5 if name == "sidebar_filter" else 1) for name in cases}
+        for name, (seconds, peak_mb) in measured.items():
+            results.append({
+                "name": name, "rows": n_rows, "seconds": seconds,
+                "rows_per_sec": n_rows / seconds if seconds else None, "peak_mb": peak_mb,
+            })
+            print(f"{name:<16} {n_rows:>10} rows  {seconds:8.3f} s  {peak_mb:9.1f} MB peak")
+    return results
+
+
+# Cold start. Every repeat runs in a fresh interpreter, so imports are paid in
+# full: importing the pipeline, and the dashboard's import time, first render
+# and first rerun through Streamlit's AppTest (Streamlit's own import is not
+# counted). peak_mb is the peak RSS of that interpreter.
+
+STARTUP_CASES = ["import_pipeline", "dashboard_import", "first_render", "rerun"]
+
+PIPELINE_START = """
+import json, time
+start = time.perf_counter()
+import pipeline
+seconds = time.perf_counter() - start
+from metrics import peak_rss_mb
+print(json.dumps({"import_pipeline": [seconds, peak_rss_mb()]}))
+"""
+
+DASHBOARD_START = """
+import json, logging, time, warnings
+warnings.filterwarnings("ignore")
+logging.disable(logging.CRITICAL)
+from streamlit.testing.v1 import AppTest
+from metrics import METRICS, peak_rss_mb
+
+app = AppTest.from_file(%r, default_timeout=300)
+start = time.perf_counter()
+app.run()
+first_render, first_peak = time.perf_counter() - start, peak_rss_mb()
+start = time.perf_counter()
+app.run()
+rerun = time.perf_counter() - start
+imports = next(e["seconds"] for e in METRICS.events if e["name"] == "app.import")
+print(json.dumps({
+    "dashboard_import": [imports, first_peak],
+    "first_render": [first_render, first_peak],
+    "rerun": [rerun, peak_rss_mb()],
+}))
+"""
+
+
+def _run_fresh(code):
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=current_dir, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run_startup(repeat=3):
+    # best time over `repeat` fresh interpreters, peak RSS of the first
+    best = {}
+    for _ in range(repeat):
+        measured = {**_run_fresh(PIPELINE_START), **_run_fresh(DASHBOARD_START % APP_FILE)}
+        for name, (seconds, peak_mb) in measured.items():
+            if name not in best:
+                best[name] = [seconds, peak_mb]
+            best[name][0] = min(best[name][0], seconds)
+
+    results = []
+    for name in STARTUP_CASES:
+        seconds, peak_mb = best[name]
+        results.append({"name": name, "rows": 0, "seconds": seconds, "rows_per_sec": None, "peak_mb": peak_mb})
+        print(f"{name:<16} {seconds:8.3f} s  {peak_mb:9.1f} MB peak RSS")
+    return results
+
+
+def save_results(results, path=RESULTS_FILE):
+    folder = os.path.dirname(path)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "thresholds": THRESHOLDS,
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+def find_regressions(results, baseline, thresholds=THRESHOLDS):
+    # compares against the results of an earlier report, case by case
+    previous = {(r["name"], r["rows"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = previous.get((result["name"], result["rows"]))
+        if old is None:
+            continue
+        for metric, limit in thresholds.items():
+            new_value, old_value = result[metric], old[metric]
+            if new_value > old_value * limit["ratio"] and new_value - old_value > limit["min_delta"]:
+                regressions.append(
+                    f"{result['name']} @ {result['rows']} rows: {metric} {old_value:.3f} -> {new_value:.3f}"
+                )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AstroBiom benchmark suite on synthetic catalogs")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--cases", nargs="+", default=CASES, choices=CASES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=RESULTS_FILE, help="where to write the JSON report")
+    parser.add_argument("--baseline", default=None, help="earlier JSON report; exit with status 1 on a regression")
+    parser.add_argument("--startup", action="store_true", help="time the cold start of the pipeline and the dashboard instead")
+    args = parser.parse_args()
+
+    if args.startup:
+        results = run_startup()
+    else:
+        if os.path.exists(RAW_FILE):
+            check_equivalence(resample_catalog(pd.read_csv(RAW_FILE), 10_000))
+        check_equivalence(synthetic_catalog(10_000, seed=args.seed))
+        results = run_suite(args.sizes, cases=args.cases, seed=args.seed)
+
+    save_results(results, args.output)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(results, json.load(f))
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions.")
@@ -0,0 +1,135 @@
+import os
+import numpy as np
+
+from storage import load_dataset, compact
+
+
+# Read-only view of the final dataset shared by every dashboard session.
+# The sidebar filters are answered from per-category row index arrays, and
+# the leaderboard and planet lookups from a presorted score order and a
+# pl_name hash index, all built once per dataset version. The frame itself is
+# kept in the compact form (categories, float32), since every session of a
+# Streamlit server shares it.
+
+INDEXED_COLUMNS = ['Planet_Type_ML', 'habitable_type']
+SCORE_COLUMN = 'AstroBiom_Score'
+
+
+def dataset_version(path):
+    # changes whenever the file is rewritten
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+def build_index(series):
+    values = series.astype('category')
+    codes = values.cat.codes.to_numpy()
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(len(values.cat.categories) + 1))
+
+    index = {}
+    for i, value in enumerate(values.cat.categories):
+        rows = order[bounds[i]:bounds[i + 1]]
+        if not len(rows):
+            # fixed label lists can have categories no planet falls into
+            continue
+        rows.flags.writeable = False
+        index[value] = rows
+    return index
+
+
+class Catalog:
+
+    def __init__(self, df, version=None):
+        self.df = df = compact(df)
+        self.version = version
+        self.indexes = {col: build_index(df[col]) for col in INDEXED_COLUMNS if col in df.columns}
+
+        # row positions from best to worst score (NaN last), and pl_name -> row
+        self.order = None
+        if SCORE_COLUMN in df.columns:
+            self.order = np.argsort(-df[SCORE_COLUMN].to_numpy(dtype=float), kind='stable')
+            self.order.flags.writeable = False
+        names = df['pl_name'].to_numpy() if 'pl_name' in df.columns else []
+        # reversed so the first row wins for a duplicated name
+        self.positions = dict(zip(names[::-1], range(len(names) - 1, -1, -1)))
+        # lowercased names for the type-ahead planet search
+        self.search_names = df['pl_name'].astype(str).str.lower() if 'pl_name' in df.columns else None
+
+    def __len__(self):
+        return len(self.df)
+
+    def categories(self, column):
+        return list(self.indexes[column])
+
+    def rows(self, column, values):
+        # sorted row positions whose column value is one of values
+        parts = [self.indexes[column][v] for v in values if v in self.indexes[column]]
+        if not parts:
+            return np.empty(0, dtype=np.intp)
+        return np.sort(np.concatenate(parts))
+
+    def select(self, **filters):
+        # filters: column=list of allowed values; None means no filter on that column.
+        # returns row positions, or None when every row passes
+        selected = None
+        for column, values in filters.items():
+            if values is None or column not in self.indexes:
+                continue
+            if set(values) >= set(self.indexes[column]):
+                continue
+            rows = self.rows(column, values)
+            selected = rows if selected is None else np.intersect1d(selected, rows, assume_unique=True)
+        return selected
+
+    def top_k(self, rows=None, k=1):
+        # best-scored row positions among `rows` (sorted positions, None = all).
+        # Walks the presorted order in growing blocks, so it stops as soon as
+        # k matches are found instead of sorting the filtered frame.
+        if rows is None:
+            return self.order[:k]
+        found = []
+        count, start, block = 0, 0, max(4 * k, 64)
+        while count < k and start < len(self.order) and len(rows):
+            chunk = self.order[start:start + block]
+            hits = chunk[rows[np.minimum(np.searchsorted(rows, chunk), len(rows) - 1)] == chunk]
+            found.append(hits)
+            count += len(hits)
+            start += block
+            block *= 2
+        if not found:
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate(found)[:k]
+
+    def search(self, text, limit=10):
+        # up to `limit` names containing `text` (any case): an exact match
+        # first, then the best-scored ones
+        text = text.strip()
+        if not text or self.search_names is None:
+            return []
+        rows = np.flatnonzero(self.search_names.str.contains(text.lower(), regex=False).to_numpy())
+        if self.order is not None:
+            rows = self.top_k(rows, k=len(rows))
+        names = [self.df['pl_name'].iat[i] for i in rows[:limit]]
+        if text in self.positions:
+            names = [text] + [name for name in names if name != text][:limit - 1]
+        return names
+
+    def lookup(self, name):
+        # row of one planet by pl_name, or None
+        position = self.positions.get(name)
+        if position is None:
+            return None
+        return self.df.iloc[position]
+
+    def frame(self, rows=None):
+        if rows is None:
+            return self.df
+        return self.df.iloc[rows]
+
+
+def load_catalog(path, version=None):
+    df = load_dataset(path)
+    if df is None:
+        return None
+    return Catalog(df, version)
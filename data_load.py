@@ -1,51 +1,109 @@
 import requests
 import pandas as pd
-import io
+import argparse
+import datetime
+import json
 import os
-import numpy as np
 
-url = "https://exoplanetarchive.ipac.caltech.edu/TAP/sync"
+from fetch import fetch_catalog, build_query
+from storage import save_dataset, load_dataset, dataset_exists
 
-# documentation https://exoplanetarchive.ipac.caltech.edu/docs/API_PS_columns.html
 
-def get_data():
+current_dir = os.path.dirname(os.path.abspath(__file__))
+RAW_FILE = os.path.join(current_dir, "data", "astrobiom_data.parquet")
+DOWNLOAD_FILE = os.path.join(current_dir, "data", "astrobiom_download.csv")
+DELTA_FILE = os.path.join(current_dir, "data", "astrobiom_delta.csv")
+STATE_FILE = os.path.join(current_dir, "data", "sync_state.json")
 
-    query=query = """
-    SELECT 
-        pl_name,           
-        hostname,          
-        discoverymethod,   
-        disc_year,         
-        pl_rade,           
-        pl_bmasse,        
-        pl_orbper,         
-        pl_orbsmax,        
-        pl_orbeccen,       
-        pl_eqt,            
-        st_mass,           
-        st_rad,            
-        st_teff,           
-        st_lum,            
-        st_spectype,       
-        sy_dist            
-    FROM ps 
-    WHERE default_flag = 1
-    """
+# deletions and default_flag switches are invisible to a delta query,
+# so a full refresh is forced once the last one is this old
+FULL_REFRESH_DAYS = 7
 
-    response=requests.get(url, params={"query":query, "format":"csv"})
 
-    if response.status_code==200:
-        df=pd.read_csv(io.StringIO(response.text))
+def load_state():
+    if os.path.exists(STATE_FILE):
+        with open(STATE_FILE) as f:
+            return json.load(f)
+    return {}
 
-        if not os.path.exists("data"):
-            os.makedirs("data")
 
-        df.to_csv("data/astrobiom_data.csv")
+def save_state(state):
+    with open(STATE_FILE, "w") as f:
+        json.dump(state, f, indent=2)
 
-    else: 
-        print("Server error", response.status_code)
+
+def latest_update(df):
+    updates = df['rowupdate'].dropna()
+    return str(updates.max()) if len(updates) else None
+
+
+def merge_delta(df_local, df_delta):
+    # rows coming from the archive replace local rows with the same pl_name
+    df_keep = df_local[~df_local['pl_name'].isin(df_delta['pl_name'])]
+    df_delta = df_delta.drop_duplicates('pl_name', keep='last')
+    return pd.concat([df_keep, df_delta], ignore_index=True)
+
+
+def get_data(csv=False, url=None):
+
+    kwargs = {"url": url} if url else {}
+    try:
+        df = fetch_catalog(DOWNLOAD_FILE, **kwargs)
+    except requests.RequestException as e:
+        print("Server error", e)
+        return None
+    except pd.errors.ParserError as e:
+        # fetch_catalog already dropped the partial file
+        print("Could not parse the download", e)
+        return None
+
+    save_dataset(df, RAW_FILE, csv=csv)
+
+    today = datetime.date.today().isoformat()
+    save_state({"watermark": latest_update(df), "last_full": today})
+    return df
+
+
+def sync_data(csv=False, url=None):
+    state = load_state()
+    today = datetime.date.today()
+
+    last_full = state.get("last_full")
+    stale = last_full is None or (today - datetime.date.fromisoformat(last_full)).days >= FULL_REFRESH_DAYS
+    if stale or not state.get("watermark") or not dataset_exists(RAW_FILE):
+        print("Full refresh.")
+        return get_data(csv=csv, url=url)
+
+    kwargs = {"url": url} if url else {}
+    try:
+        df_delta = fetch_catalog(DELTA_FILE, query=build_query(since=state["watermark"]), **kwargs)
+    except requests.RequestException as e:
+        print("Server error", e)
+        return None
+    except pd.errors.ParserError as e:
+        # fetch_catalog already dropped the partial file
+        print("Could not parse the download", e)
+        return None
+
+    df = merge_delta(load_dataset(RAW_FILE), df_delta)
+    save_dataset(df, RAW_FILE, csv=csv)
+
+    print(f"Sync: {len(df_delta)} new or updated planets since {state['watermark']}.")
+
+    if latest_update(df_delta):
+        state["watermark"] = max(state["watermark"], latest_update(df_delta))
+        save_state(state)
+    return df
 
 
 
 if __name__ == "__main__":
-    get_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Download the raw catalog")
+    parser.add_argument("--csv", action="store_true", help="also write a CSV copy")
+    parser.add_argument("--sync", action="store_true", help="fetch only rows updated since the last run")
+    args = parser.parse_args()
+
+    if args.sync:
+        sync_data(csv=args.csv)
+    else:
+        get_data(csv=args.csv)
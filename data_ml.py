@@ -1,26 +1,134 @@
 import pandas as pd
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from multiprocessing import shared_memory
+import argparse
+import json
 import os
 
-def run_clustering(df):
+from metrics import timer
+from neighbors import FILTER_COLUMNS, NeighborIndex, save_index, NEIGHBORS_FILE
+from storage import DatasetWriter, iter_dataset, save_dataset, load_dataset, dataset_exists, memory_mb
+
+FEATURES = ['pl_bmasse', 'pl_rade', 'pl_density', 'pl_eqt']
+
+# scikit-learn and scipy take about a second to import, so they are imported
+# inside the functions that fit: assigning with a saved model, the
+# up-to-date check and the pipeline's cached runs never load them.
+
+
+def name_cluster(rad, mass, temp):
+    if rad > 8.0:
+        return "Gas Giant (Jovian)" 
+    elif rad > 3.0:
+        return "Ice Giant (Neptunian)" 
+    elif mass > 2000 or temp > 2000:
+        return "Hot Jupiter / Star" 
+    else:
+        return "Rocky / Super-Earth" 
+
+
+def match_centroids(centroids, previous_centroids):
+    # keep cluster ids stable: order of the new centroids that puts each one
+    # at the id of the closest old one
+    from scipy.optimize import linear_sum_assignment
+
+    cost = np.linalg.norm(centroids[:, None, :] - previous_centroids[None, :, :], axis=2)
+    new_ids, old_ids = linear_sum_assignment(cost)
+    return new_ids[np.argsort(old_ids)]
+
+
+def warm_start_centers(previous, scaler, features, n_clusters):
+    # old centroids moved into the new scaled space, or None when the
+    # previous model does not fit this run
+    if previous is None or previous['n_clusters'] != n_clusters or previous['features'] != list(features):
+        return None
+    centers = np.array(previous['centroids']) * np.array(previous['scale']) + np.array(previous['mean'])
+    return (centers - scaler.mean_) / scaler.scale_
+
+
+def model_version(previous):
+    # versions only go up, even when the previous centroids cannot seed the
+    # fit (other k or features), so a version never names two models
+    return previous['version'] + 1 if previous is not None else 1
+
+
+def fit_model(X, n_clusters=4, previous=None, mini_batch=False):
+    # X holds raw feature values (no NaN); the artifact stores everything
+    # needed to assign new planets without sklearn
+    from sklearn.cluster import KMeans, MiniBatchKMeans
+    from sklearn.preprocessing import StandardScaler
+
+    with timer("cluster.scale", rows=len(X)):
+        scaler = StandardScaler()
+        X_scaled = scaler.fit_transform(X)
+
+    version = model_version(previous)
+    init, n_init = 'k-means++', 10
+    centers = warm_start_centers(previous, scaler, X.columns, n_clusters)
+    if centers is not None:
+        init, n_init = centers, 1
+    else:
+        previous = None
+
+    if mini_batch:
+        kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=42, init=init, n_init=n_init, batch_size=4096)
+    else:
+        kmeans = KMeans(n_clusters=n_clusters, random_state=42, init=init, n_init=n_init)
+    with timer("cluster.fit", rows=len(X), algorithm=type(kmeans).__name__, warm_start=previous is not None):
+        kmeans.fit(X_scaled)
+    centroids, labels = kmeans.cluster_centers_, kmeans.labels_
+
+    if previous is not None:
+        order = match_centroids(centroids, init)
+        centroids = centroids[order]
+        relabel = np.empty(n_clusters, dtype=int)
+        relabel[order] = np.arange(n_clusters)
+        labels = relabel[labels]
+
+    # names come from the mean planet of each cluster
+    summary = X.groupby(labels).mean()
+    names = {}
+    for cluster_id, row in summary.iterrows():
+        names[str(cluster_id)] = name_cluster(row['pl_rade'], row['pl_bmasse'], row['pl_eqt'])
+
+    return {
+        'version': version,
+        'features': list(X.columns),
+        'n_clusters': n_clusters,
+        'mean': scaler.mean_.tolist(),
+        'scale': scaler.scale_.tolist(),
+        'centroids': centroids.tolist(),
+        'cluster_names': names,
+    }
+
+
+def predict_clusters(X, model):
+    X_scaled = (X.to_numpy() - np.array(model['mean'])) / np.array(model['scale'])
+    distances = np.stack([((X_scaled - center) ** 2).sum(axis=1) for center in np.array(model['centroids'])], axis=1)
+    return distances.argmin(axis=1)
+
+
+def assign_clusters(df, model):
+    # predict-only path: no refit, just the nearest stored centroid
+    X = df[model['features']].dropna()
+    with timer("cluster.assign", rows=len(X)):
+        df.loc[X.index, 'cluster_id'] = predict_clusters(X, model)
+    names = {int(cluster_id): name for cluster_id, name in model['cluster_names'].items()}
+    df['Planet_Type_ML'] = df['cluster_id'].map(names)
+    return df
+
+
+def run_clustering(df, previous=None, mini_batch=False):
     
 
-    features = ['pl_bmasse', 'pl_rade', 'pl_density', 'pl_eqt']
+    features = FEATURES
     
     X = df[features].dropna()
     
-    indices = X.index
-    
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
-    
-
-    kmeans = KMeans(n_clusters=4, random_state=42, n_init=10)
-    clusters = kmeans.fit_predict(X_scaled)
-    
-
-    df.loc[indices, 'cluster_id'] = clusters
+    model = fit_model(X, previous=previous, mini_batch=mini_batch)
+    df = assign_clusters(df, model)
     
 
 
@@ -28,52 +136,287 @@ def run_clustering(df):
     print(summary)
     
    
-    cluster_names = {}
-    
-    for cluster_id, row in summary.iterrows():
-        rad = row['pl_rade']
-        mass = row['pl_bmasse']
-        temp = row['pl_eqt']
-        
-        if rad > 8.0:
-            name = "Gas Giant (Jovian)" 
-        elif rad > 3.0:
-            name = "Ice Giant (Neptunian)" 
-        elif mass > 2000 or temp > 2000:
-            name = "Hot Jupiter / Star" 
-        else:
-            name = "Rocky / Super-Earth" 
-            
-        cluster_names[cluster_id] = name
-    
-
-    df['Planet_Type_ML'] = df['cluster_id'].map(cluster_names)
-    
-   
     print(df['Planet_Type_ML'].value_counts())
     
-    return df
+    return df, model
 
-if __name__ == "__main__":
 
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    
+# Out-of-core mode for catalogs larger than memory. The processed dataset is
+# read in chunks: once for the global scaler statistics, `epochs` times for
+# MiniBatchKMeans.partial_fit on scaled mini-batches, and once more to assign
+# every planet and write the output chunk by chunk.
 
-    INPUT_FILE = os.path.join(current_dir, "data", "astrobiom_processed.csv")
-    
+def _scaled_batches(read_features, scaler, batch_size, rng):
+    # fixed-size batches across chunk borders, shuffled within each chunk
+    carry = np.empty((0, len(scaler.mean_)))
+    for X in read_features():
+        X = scaler.transform(X.dropna().to_numpy())
+        X = np.concatenate([carry, X[rng.permutation(len(X))]])
+        whole = len(X) - len(X) % batch_size
+        for start in range(0, whole, batch_size):
+            yield X[start:start + batch_size]
+        carry = X[whole:]
+    if len(carry):
+        yield carry
 
-    OUTPUT_FILE = os.path.join(current_dir, "data", "astrobiom_final.csv")
-    
-    if os.path.exists(INPUT_FILE):
-   
-        df = pd.read_csv(INPUT_FILE)
-        
 
-        df_final = run_clustering(df)
-        
+def fit_model_streaming(read_features, n_clusters=4, previous=None, epochs=3, batch_size=4096):
+    # read_features() returns a fresh iterator of raw feature frames (NaN allowed)
+    from sklearn.cluster import MiniBatchKMeans
+    from sklearn.preprocessing import StandardScaler
+
+    scaler = StandardScaler()
+    features = None
+    with timer("cluster.scale", streaming=True) as t:
+        t["rows"] = 0
+        for X in read_features():
+            features = list(X.columns)
+            X = X.dropna()
+            if len(X):
+                scaler.partial_fit(X.to_numpy())
+                t["rows"] += len(X)
+    if t["rows"] < n_clusters:
+        raise ValueError(f"Only {t['rows']} complete planets for {n_clusters} clusters")
+
+    centers = warm_start_centers(previous, scaler, features, n_clusters)
+    kmeans = MiniBatchKMeans(
+        n_clusters=n_clusters, random_state=42, batch_size=batch_size, n_init=1,
+        init=centers if centers is not None else 'k-means++',
+    )
+    rng = np.random.default_rng(42)
+    with timer("cluster.fit", rows=t["rows"] * epochs, algorithm="MiniBatchKMeans", streaming=True):
+        for _ in range(epochs):
+            for batch in _scaled_batches(read_features, scaler, batch_size, rng):
+                # the first call initializes the centroids and needs n_clusters rows
+                if len(batch) >= n_clusters or hasattr(kmeans, 'cluster_centers_'):
+                    kmeans.partial_fit(batch)
 
-        df_final.to_csv(OUTPUT_FILE, index=False)
+    centroids = kmeans.cluster_centers_
+    if centers is not None:
+        centroids = centroids[match_centroids(centroids, centers)]
+
+    # a k-means centroid is the mean of its members, so its raw-unit
+    # position names the cluster without another pass over the data
+    names = {}
+    for cluster_id, center in enumerate(centroids * scaler.scale_ + scaler.mean_):
+        row = dict(zip(features, center))
+        names[str(cluster_id)] = name_cluster(row['pl_rade'], row['pl_bmasse'], row['pl_eqt'])
+
+    return {
+        'version': model_version(previous),
+        'features': features,
+        'n_clusters': n_clusters,
+        'mean': scaler.mean_.tolist(),
+        'scale': scaler.scale_.tolist(),
+        'centroids': centroids.tolist(),
+        'cluster_names': names,
+    }
+
+
+def build_neighbor_index(model=None):
+    # The KD-tree needs every planet's features at once (but nothing else),
+    # so it is its own step that out-of-core runs can skip or run elsewhere.
+    model = model or load_model(MODEL_FILE)
+    if model is None or not dataset_exists(OUTPUT_FILE):
+        print("Error: run the clustering first")
+        return None
+    df_index = load_dataset(OUTPUT_FILE, columns=['pl_name'] + FEATURES + FILTER_COLUMNS)
+    with timer("cluster.neighbor_index", rows=len(df_index)):
+        index = NeighborIndex(df_index, model)
+        save_index(index, NEIGHBORS_FILE)
+    return index
+
+
+def drop_neighbor_index():
+    # an index of the previous model would no longer match the clusters
+    if os.path.exists(NEIGHBORS_FILE):
+        os.remove(NEIGHBORS_FILE)
+    print("Neighbour index skipped; build it with `python data_ml.py --neighbors-only`.")
+
+
+def run_streaming(chunk_rows=100_000, epochs=3, csv=False, neighbors=True, incremental=False, refit=False):
+    # The fit is always mini-batch here. incremental assigns with the saved
+    # model like the in-memory run, but never skips: telling whether any
+    # planet changed would need the whole previous output in memory.
+    if not dataset_exists(INPUT_FILE):
+        print("Error: 'astrobiom_processed' dataset not found")
+        return None
+
+    def read_features():
+        return (chunk[FEATURES] for chunk in iter_dataset(INPUT_FILE, columns=FEATURES, chunk_rows=chunk_rows))
+
+    model = load_model(MODEL_FILE)
+    if incremental and model is not None and not refit:
+        print(f"Assigning with cluster model v{model['version']}.")
+    else:
+        model = fit_model_streaming(read_features, previous=model, epochs=epochs)
+        save_model(model, MODEL_FILE)
+
+    with DatasetWriter(OUTPUT_FILE, csv=csv) as out:
+        for df in iter_dataset(INPUT_FILE, chunk_rows=chunk_rows):
+            out.write(assign_clusters(df, model))
+    print(f"Clustered {out.rows} planets in chunks of {chunk_rows} (model v{model['version']}).")
+
+    if neighbors:
+        build_neighbor_index(model)
+    else:
+        drop_neighbor_index()
+    return model
+
+
+def load_model(path):
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return None
+
+
+def save_model(model, path):
+    with open(path, "w") as f:
+        json.dump(model, f, indent=2)
+
+def is_up_to_date(df, df_prev):
+    # Clustering is global, so it can only be skipped when no planet changed
+    # at all. row_hash only covers the raw columns; the processed ones
+    # (scores, recovered values) change with the processing code too, so
+    # every column of the input is compared with the previous output.
+    columns = list(df.columns)
+    if 'pl_name' not in columns or any(col not in df_prev.columns for col in columns):
+        return False
+    current = set(zip(df['pl_name'], pd.util.hash_pandas_object(df[columns], index=False)))
+    previous = set(zip(df_prev['pl_name'], pd.util.hash_pandas_object(df_prev[columns], index=False)))
+    return current == previous
+
+
+# Sweep mode: a grid of k values and feature subsets fitted in a process
+# pool. The scaled feature matrix is built once and shared with the workers
+# through shared memory, so it is never pickled. Each task copies only its
+# own column subset out of it (KMeans wants a C-contiguous array, so even a
+# view would be copied).
+
+_shared = {}
+
+
+def _attach(name, shape):
+    # one BLAS/OpenMP thread per worker, the pool itself provides the parallelism
+    from threadpoolctl import threadpool_limits
+
+    threadpool_limits(1)
+    shm = shared_memory.SharedMemory(name=name)
+    _shared['shm'] = shm
+    _shared['X'] = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+
+
+def _evaluate(k, columns, seeds, silhouette_size):
+    from sklearn.cluster import KMeans
+    from sklearn.metrics import adjusted_rand_score, silhouette_score
+
+    # per-task copy of the task's columns only
+    X = _shared['X'][:, list(columns)]
+
+    fits = [KMeans(n_clusters=k, random_state=seed, n_init=4).fit(X) for seed in seeds]
+    best = min(fits, key=lambda fit: fit.inertia_)
+
+    size = min(silhouette_size, len(X))
+    silhouette = silhouette_score(X, best.labels_, sample_size=size, random_state=0)
+    # stability: how well the other seeds reproduce the best partition
+    stability = np.mean([adjusted_rand_score(best.labels_, fit.labels_) for fit in fits if fit is not best])
+
+    return {
+        'k': k,
+        'features': '+'.join(FEATURES[i] for i in columns),
+        'silhouette': silhouette,
+        'inertia': best.inertia_,
+        'stability': stability,
+    }
+
+
+def sweep_clustering(df, k_values=(2, 3, 4, 5, 6, 8), feature_sets=None, workers=None, seeds=(42, 7, 2024), silhouette_size=10000):
+    from sklearn.preprocessing import StandardScaler
+
+    if feature_sets is None:
+        feature_sets = [subset for size in range(2, len(FEATURES) + 1) for subset in combinations(FEATURES, size)]
+    column_sets = [tuple(FEATURES.index(f) for f in subset) for subset in feature_sets]
+
+    X_scaled = StandardScaler().fit_transform(df[FEATURES].dropna())
+
+    shm = shared_memory.SharedMemory(create=True, size=X_scaled.nbytes)
+    try:
+        np.ndarray(X_scaled.shape, dtype=np.float64, buffer=shm.buf)[:] = X_scaled
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(shm.name, X_scaled.shape)) as pool:
+            futures = [pool.submit(_evaluate, k, columns, seeds, silhouette_size) for k in k_values for columns in column_sets]
+            results = [future.result() for future in futures]
+    finally:
+        shm.close()
+        shm.unlink()
+
+    report = pd.DataFrame(results).sort_values(['silhouette', 'stability'], ascending=False)
+    report.insert(0, 'rank', np.arange(1, len(report) + 1))
+    return report.reset_index(drop=True)
+
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+INPUT_FILE = os.path.join(current_dir, "data", "astrobiom_processed.parquet")
+OUTPUT_FILE = os.path.join(current_dir, "data", "astrobiom_final.parquet")
+MODEL_FILE = os.path.join(current_dir, "data", "cluster_model.json")
+SWEEP_FILE = os.path.join(current_dir, "data", "cluster_sweep.csv")
+
+
+def run(incremental=False, refit=False, mini_batch=False, csv=False, chunk_rows=None, epochs=3, neighbors=True):
+    if chunk_rows:
+        # mini_batch needs no flag there: the streaming fit is MiniBatchKMeans
+        return run_streaming(chunk_rows=chunk_rows, epochs=epochs, csv=csv, neighbors=neighbors,
+                             incremental=incremental, refit=refit)
+
+    if not dataset_exists(INPUT_FILE):
+        print("Error: 'astrobiom_processed' dataset not found")
+        return None
+
+    df = load_dataset(INPUT_FILE)
+    model = load_model(MODEL_FILE)
+
+    if incremental and dataset_exists(OUTPUT_FILE) and is_up_to_date(df, load_dataset(OUTPUT_FILE, columns=list(df.columns))):
+        print("No changes since the last run, clustering skipped.")
+        return None
+
+    if incremental and model is not None and not refit:
+        df_final = assign_clusters(df, model)
+        print(f"Assigned with cluster model v{model['version']}.")
+    else:
+        df_final, model = run_clustering(df, previous=model, mini_batch=mini_batch)
+        save_model(model, MODEL_FILE)
+
+    print(f"Memory: clustered catalog {memory_mb(df_final):.1f} MB.")
+    save_dataset(df_final, OUTPUT_FILE, csv=csv)
+    if neighbors:
+        with timer("cluster.neighbor_index", rows=len(df_final)):
+            save_index(NeighborIndex(df_final, model), NEIGHBORS_FILE)
+    else:
+        drop_neighbor_index()
+    return df_final
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AstroBiom clustering")
+    parser.add_argument("--incremental", action="store_true", help="reuse the saved model and only assign planets (skipped when nothing changed, except with --chunk-rows)")
+    parser.add_argument("--refit", action="store_true", help="refit even in incremental mode (warm-started)")
+    parser.add_argument("--mini-batch", action="store_true", help="fit with MiniBatchKMeans for large catalogs")
+    parser.add_argument("--csv", action="store_true", help="also write a CSV copy")
+    parser.add_argument("--chunk-rows", type=int, default=None, help="out-of-core mode: stream the catalog in chunks of this many rows (always mini-batch)")
+    parser.add_argument("--epochs", type=int, default=3, help="passes of mini-batch fitting in out-of-core mode")
+    parser.add_argument("--no-neighbors", action="store_true", help="skip the neighbour index (it needs every planet's features in memory)")
+    parser.add_argument("--neighbors-only", action="store_true", help="only rebuild the neighbour index from the last clustering")
+    parser.add_argument("--sweep", action="store_true", help="rank a grid of k values and feature subsets instead of clustering")
+    parser.add_argument("--k", type=int, nargs="+", default=[2, 3, 4, 5, 6, 8], help="k values for --sweep")
+    parser.add_argument("--workers", type=int, default=None, help="processes for --sweep (default: all cores)")
+    args = parser.parse_args()
 
+    if args.sweep:
+        report = sweep_clustering(load_dataset(INPUT_FILE), k_values=args.k, workers=args.workers)
+        report.to_csv(SWEEP_FILE, index=False)
+        print(report.head(10).to_string(index=False))
+    elif args.neighbors_only:
+        build_neighbor_index()
     else:
-        print("Error: 'astrobiom_processed.csv' not found")
-       
\ No newline at end of file
+        run(incremental=args.incremental, refit=args.refit, mini_batch=args.mini_batch, csv=args.csv,
+            chunk_rows=args.chunk_rows, epochs=args.epochs, neighbors=not args.no_neighbors)
@@ -1,128 +1,626 @@
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import argparse
+import contextlib
+import hashlib
+import io
+import json
 import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 
-def process_data(df):
+from metrics import timer, count
+from storage import DatasetWriter, iter_dataset, save_dataset, load_dataset, dataset_exists, memory_mb
 
-    df_clean = df.copy()
+
+# Vectorized scoring kernels. Each one takes numpy arrays (any shape) and
+# gives the same result as the old row-by-row .apply callbacks, NaN included.
+# The *_codes variants return the index into the matching *_LABELS list;
+# the label functions wrap those codes in a Categorical (one byte per row)
+# whose categories are that fixed list.
+
+def luminosity(st_rad, st_teff):
+    # log10(L / L_sun) from Stefan-Boltzmann
+    return np.log10((st_rad**2) * ((st_teff / 5778)**4))
+
+
+def semi_major_axis(period_days, st_mass):
+    # Kepler's third law, AU
+    P_years = period_days / 365.25
+    return (st_mass * (P_years**2))**(1/3)
+
+
+def mass_from_radius(radius):
+    return radius ** 2.06
+
+
+def density(mass, radius):
+    return mass / (radius ** 3)
+
+
+def insolation(st_lum, orbsmax):
+    return (10 ** st_lum) / (orbsmax ** 2)
+
+
+def equilibrium_temperature(st_teff, st_rad, orbsmax):
+    return st_teff * np.sqrt(st_rad / (2 * orbsmax * 215.032))
+
+
+# Conservative habitable zone of Kopparapu et al. (2014), 1 Earth mass:
+# S_eff = S_sun + a*T + b*T^2 + c*T^3 + d*T^4 with T = T_eff - 5780 K, fitted
+# for 2600-7200 K. Without a temperature the old solar limits apply.
+HZ_RUNAWAY_GREENHOUSE = (1.107, 1.332e-4, 1.580e-8, -8.308e-12, -1.931e-15)
+HZ_MAXIMUM_GREENHOUSE = (0.356, 6.171e-5, 1.698e-9, -3.198e-12, -5.575e-16)
+HZ_DEFAULT_FLUX = (1.11, 0.36)
+
+
+def hz_flux(st_teff, coefficients):
+    t = np.clip(st_teff, 2600, 7200) - 5780
+    s_sun, a, b, c, d = coefficients
+    return s_sun + t * (a + t * (b + t * (c + t * d)))
+
+
+def hz_flux_limits(st_teff):
+    # (inner, outer) edge of the zone as stellar flux in Earth units
+    inner = hz_flux(st_teff, HZ_RUNAWAY_GREENHOUSE)
+    outer = hz_flux(st_teff, HZ_MAXIMUM_GREENHOUSE)
+    missing = np.isnan(st_teff)
+    return np.where(missing, HZ_DEFAULT_FLUX[0], inner), np.where(missing, HZ_DEFAULT_FLUX[1], outer)
+
+
+def hz_distance(st_lum, s_eff):
+    # AU at which the star delivers s_eff
+    return np.sqrt(10 ** st_lum / s_eff)
+
+
+HABITABILITY_LABELS = ["Too Hot (Hot Zone)", "Too Cold (Cold Zone)", "Habitable Zone (Goldilocks)"]
+BIO_LABELS = ["Unknown", "Complex Life Possible", "Microbial Life Only", "Extreme Environment"]
+ATMOSPHERE_LABELS = ["No Atmosphere (Likely)", "Atmosphere Risk (Erosion)", "Atmosphere Likely"]
+ADAMS_LABELS = ["Prime Habitability (Adams 2025)", "Habitable (Fast Rotator)", "Marginal (Slow Rotator)", "Not Habitable"]
+
+
+def _codes(conditions):
+    # first matching condition wins, like the if/elif chains; no match -> last label
+    return np.select(conditions, list(range(len(conditions))), default=len(conditions))
+
+
+def _label(codes, labels):
+    return pd.Categorical.from_codes(codes, categories=labels)
+
+
+def habitability_codes(flux, inner=HZ_DEFAULT_FLUX[0], outer=HZ_DEFAULT_FLUX[1]):
+    # inner/outer: flux at the edges of the host's zone (hz_flux_limits).
+    # NaN flux fails both comparisons and lands in the Goldilocks bucket, as before
+    return _codes([flux > inner, flux < outer])
+
+
+def habitability_class(flux, inner=HZ_DEFAULT_FLUX[0], outer=HZ_DEFAULT_FLUX[1]):
+    return _label(habitability_codes(flux, inner, outer), HABITABILITY_LABELS)
+
+
+def esi(radius, density, temp):
+    r_ref, d_ref, t_ref = 1.0, 1.0, 288.0
+    w_r, w_d, w_t = 0.57, 1.07, 5.58
+    with np.errstate(invalid='ignore', divide='ignore'):
+        esi_r = (1 - np.abs((radius - r_ref) / (radius + r_ref))) ** w_r
+        esi_d = (1 - np.abs((density - d_ref) / (density + d_ref))) ** w_d
+        esi_t = (1 - np.abs((temp - t_ref) / (temp + t_ref))) ** w_t
+        value = (esi_r * esi_d * esi_t) ** (1/3)
+    return np.where(np.isnan(temp), 0.0, value)
+
+
+def bio_codes(temp_k):
+    temp_c = temp_k - 273.15
+    return _codes([np.isnan(temp_k), (temp_c >= -18) & (temp_c <= 105), (temp_c >= -18) & (temp_c <= 122)])
+
+
+def bio_class(temp_k):
+    return _label(bio_codes(temp_k), BIO_LABELS)
+
+
+def escape_velocity(mass, radius):
+    return 11.186 * np.sqrt(mass / radius)
+
+
+def atmosphere_codes(v_esc, insolation):
+    return _codes([v_esc < 3.0, insolation > (v_esc / 6.0) ** 4])
+
+
+def atmosphere_class(v_esc, insolation):
+    return _label(atmosphere_codes(v_esc, insolation), ATMOSPHERE_LABELS)
+
+
+def adams_score(temp_k, period):
+    temp_c = temp_k - 273.15
+    in_range = (temp_c >= 0) & (temp_c <= 100)
+    rotation = np.where(period < 20, 2.0, 0.5) + np.where((period >= 10) & (period <= 20), 1.0, 0.0)
+    rotation = np.where(np.isnan(period), 0.0, rotation)
+    return np.where(in_range, 1.0 + rotation, 0.0)
+
+
+def adams_codes(score):
+    return _codes([score >= 4.0, score >= 2.0, score > 0])
+
+
+def adams_category(score):
+    return _label(adams_codes(score), ADAMS_LABELS)
+
+
+def _recover(df, column, estimate):
+    # fills the gaps in one column from estimate(df) and counts how many were filled
+    with timer("process.recover", rows=len(df), column=column):
+        before = df[column].isna().sum()
+        df[column] = df[column].fillna(estimate(df))
+        count("process.recovered_values", int(before - df[column].isna().sum()), column=column)
+
+
+# Star-level table. Everything that depends only on the host star is
+# computed once per star and broadcast to its planets by row position. A
+# star is a hostname with the stellar parameters of its first planet; the
+# archive can give the planets of one host different parameter sets, and a
+# planet that disagrees with its host's first row gets a star row of its
+# own, so the broadcast values are exactly the per-planet ones. star_table
+# holds what the planets read (the habitable-zone limits); star_summary adds
+# the columns only the saved table (astrobiom_stars) has.
+
+STAR_PARAMETERS = ['st_teff', 'st_rad', 'st_mass', 'st_lum']
+
+
+def star_table(df):
+    # -> (stars, star_of): one row per star, and the star row of every planet
+    with timer("process.stars", rows=len(df)) as t:
+        if 'hostname' in df.columns:
+            # planets without a hostname are their own star, as in shard_ids
+            hosts = df['hostname'].fillna(df['pl_name']) if 'pl_name' in df.columns else df['hostname']
+            star_of, _ = pd.factorize(hosts, use_na_sentinel=False)
+            star_of = star_of.astype(np.intp)
+            _, first = np.unique(star_of, return_index=True)
+        else:
+            star_of = np.arange(len(df))
+            first = star_of
+
+        same = np.ones(len(df), dtype=bool)
+        for col in STAR_PARAMETERS:
+            values = df[col].to_numpy(dtype=float)
+            ref = values[first][star_of]
+            same &= (values == ref) | (np.isnan(values) & np.isnan(ref))
+        odd = np.flatnonzero(~same)
+        star_of[odd] = len(first) + np.arange(len(odd))
+        first = np.concatenate([first, odd])
+
+        key = [col for col in ['hostname'] + STAR_PARAMETERS if col in df.columns]
+        stars = df[key].take(first).reset_index(drop=True)
+        t["rows"] = len(stars)
+
+        inner, outer = hz_flux_limits(stars['st_teff'].to_numpy())
+        stars['hz_inner_flux'] = inner
+        stars['hz_outer_flux'] = outer
+    return stars, star_of
+
+
+def star_summary(stars, star_of):
+    # the saved star table: recovered luminosity, habitable zone in AU and planets per star
+    stars = stars.copy()
+    stars['st_lum'] = stars['st_lum'].fillna(luminosity(stars['st_rad'], stars['st_teff']))
+    lum = stars['st_lum'].to_numpy()
+    stars['hz_inner_au'] = hz_distance(lum, stars['hz_inner_flux'].to_numpy())
+    stars['hz_outer_au'] = hz_distance(lum, stars['hz_outer_flux'].to_numpy())
+    stars['n_planets'] = np.bincount(star_of, minlength=len(stars))
+    return stars
+
+
+# Scoring components. Every derived column comes from one component, which
+# declares the columns it reads and the ones it writes; compute(ev) gets the
+# Evaluator and returns {column: values}. The Evaluator runs only the
+# components behind the columns asked for, dependencies first, each at most
+# once. A new theory is one more @component function.
+
+COMPONENTS = {}
+
+
+def component(name, inputs, outputs):
+    def register(compute):
+        COMPONENTS[name] = {"inputs": inputs, "outputs": outputs, "compute": compute}
+        return compute
+    return register
+
+
+class Evaluator:
+
+    def __init__(self, df, components=None, stars=None):
+        # stars: (stars, star_of) from star_table, when the caller built it
+        # anyway (to save it); components fall back to per-planet values
+        self.df = df
+        self.components = COMPONENTS if components is None else components
+        self.producers = {col: name for name, c in self.components.items() for col in c["outputs"]}
+        self.done = set()
+        self._stars = stars
+
+    def __getitem__(self, column):
+        return self.df[column]
+
+    def array(self, column):
+        return self.df[column].to_numpy()
+
+    def stars(self):
+        # None when no star table was passed in
+        return self._stars
+
+    def plan(self, columns):
+        # component names in dependency order; a component reading its own
+        # output (the pl_eqt fill) reads the input column
+        order, seen = [], set()
+
+        def visit(name, path):
+            if name in seen:
+                return
+            if name in path:
+                raise ValueError(f"Circular scoring components: {' -> '.join(path + [name])}")
+            for col in self.components[name]["inputs"]:
+                producer = self.producers.get(col)
+                if producer is not None and producer != name:
+                    visit(producer, path + [name])
+            seen.add(name)
+            order.append(name)
+
+        for col in columns:
+            if col in self.producers:
+                visit(self.producers[col], [])
+            elif col not in self.df.columns:
+                raise KeyError(f"No scoring component produces {col!r}")
+        return order
+
+    def compute(self, columns):
+        for name in self.plan(columns):
+            if name in self.done:
+                continue
+            with timer("process.score", rows=len(self.df), block=name):
+                for col, values in self.components[name]["compute"](self).items():
+                    self.df[col] = values
+            self.done.add(name)
+        return self.df
+
+
+# 2 Physics
+
+@component("density", inputs=['pl_bmasse', 'pl_rade'], outputs=['pl_density'])
+def _density(ev):
+    return {'pl_density': density(ev['pl_bmasse'], ev['pl_rade'])}
+
+
+@component("insolation", inputs=['st_lum', 'pl_orbsmax'], outputs=['insolation'])
+def _insolation(ev):
+    return {'insolation': insolation(ev['st_lum'], ev['pl_orbsmax'])}
+
+
+@component("temperature", inputs=['pl_eqt', 'st_teff', 'st_rad', 'pl_orbsmax'], outputs=['pl_eqt'])
+def _temperature(ev):
+    return {'pl_eqt': ev['pl_eqt'].fillna(equilibrium_temperature(ev['st_teff'], ev['st_rad'], ev['pl_orbsmax']))}
+
+
+@component("habitable_zone", inputs=['st_teff'], outputs=['hz_inner_flux', 'hz_outer_flux'])
+def _habitable_zone(ev):
+    # limits of each planet's own star: broadcast from the star table when
+    # there is one, else from the planet's st_teff (the same values; building
+    # the table costs more than the polynomial it would save)
+    if ev.stars() is None:
+        inner, outer = hz_flux_limits(ev.array('st_teff'))
+        return {'hz_inner_flux': inner, 'hz_outer_flux': outer}
+    stars, star_of = ev.stars()
+    return {
+        'hz_inner_flux': stars['hz_inner_flux'].to_numpy()[star_of],
+        'hz_outer_flux': stars['hz_outer_flux'].to_numpy()[star_of],
+    }
+
+
+@component("habitable_type", inputs=['insolation', 'hz_inner_flux', 'hz_outer_flux'], outputs=['habitable_type'])
+def _habitable_type(ev):
+    return {'habitable_type': habitability_class(ev.array('insolation'), ev.array('hz_inner_flux'), ev.array('hz_outer_flux'))}
+
+
+@component("ESI", inputs=['pl_rade', 'pl_density', 'pl_eqt'], outputs=['ESI'])
+def _esi(ev):
+    return {'ESI': esi(ev.array('pl_rade'), ev.array('pl_density'), ev.array('pl_eqt'))}
+
+
+# 3. Science
+
+# A. Bio Class (Schulze-Makuch)
+@component("Bio_Class", inputs=['pl_eqt'], outputs=['Bio_Class'])
+def _bio(ev):
+    return {'Bio_Class': bio_class(ev.array('pl_eqt'))}
+
+
+# B. Atmosphere (Zahnle & Catling 2017)
+@component("Atmosphere_Class", inputs=['pl_bmasse', 'pl_rade', 'insolation'], outputs=['v_esc', 'Atmosphere_Class'])
+def _atmosphere(ev):
+    v_esc = escape_velocity(ev.array('pl_bmasse'), ev.array('pl_rade'))
+    return {'v_esc': v_esc, 'Atmosphere_Class': atmosphere_class(v_esc, ev.array('insolation'))}
+
+
+# C. Adams 2025
+@component("Adams", inputs=['pl_eqt', 'pl_orbper'], outputs=['Adams_Score', 'Adams_Category'])
+def _adams(ev):
+    score = adams_score(ev.array('pl_eqt'), ev.array('pl_orbper'))
+    return {'Adams_Score': score, 'Adams_Category': adams_category(score)}
+
+
+# D. Final Score
+@component("AstroBiom_Score", inputs=['ESI', 'Adams_Score'], outputs=['AstroBiom_Score'])
+def _astrobiom_score(ev):
+    return {'AstroBiom_Score': (ev['ESI'] * 10) + ev['Adams_Score']}
+
+
+SCORE_COLUMNS = [col for c in COMPONENTS.values() for col in c["outputs"]]
+
+
+def process_data(df, columns=None, stars=None):
+    # columns: derived columns to compute (default: all of SCORE_COLUMNS)
+    # stars: star_table(df), when the caller builds the table anyway
+
+    # shallow: columns are replaced, never written in place, so the caller's
+    # frame stays untouched without copying all of it
+    df_clean = df.copy(deep=False)
 
     # 1 data recovery
     
-    # lum
-    mask_lum = df_clean['st_lum'].isnull() & df_clean['st_rad'].notnull() & df_clean['st_teff'].notnull()
-    df_clean.loc[mask_lum, 'st_lum'] = np.log10(
-        (df_clean.loc[mask_lum, 'st_rad']**2) * ((df_clean.loc[mask_lum, 'st_teff'] / 5778)**4)
-    )
+    # lum, per planet: the same values as per star, without the star table
+    _recover(df_clean, 'st_lum', lambda d: luminosity(d['st_rad'], d['st_teff']))
 
     # orb
-    mask_orbit = df_clean['pl_orbsmax'].isnull() & df_clean['pl_orbper'].notnull() & df_clean['st_mass'].notnull()
-    if mask_orbit.any():
-        P_years = df_clean.loc[mask_orbit, 'pl_orbper'] / 365.25
-        M_star = df_clean.loc[mask_orbit, 'st_mass']
-        df_clean.loc[mask_orbit, 'pl_orbsmax'] = (M_star * (P_years**2))**(1/3)
+    _recover(df_clean, 'pl_orbsmax', lambda d: semi_major_axis(d['pl_orbper'], d['st_mass']))
 
     # mass
-    mask_mass = df_clean['pl_bmasse'].isnull() & df_clean['pl_rade'].notnull()
-    df_clean.loc[mask_mass, 'pl_bmasse'] = df_clean.loc[mask_mass, 'pl_rade'] ** 2.06
+    _recover(df_clean, 'pl_bmasse', lambda d: mass_from_radius(d['pl_rade']))
 
   
-    df_final = df_clean.dropna(subset=['st_lum', 'pl_orbsmax', 'pl_bmasse', 'pl_rade', 'st_teff']).copy()
+    # rows with everything needed below; take() returns a frame of its own,
+    # so the old dropna().copy() double copy is gone
+    with timer("process.filter", rows=len(df_clean)):
+        complete = df_clean[['st_lum', 'pl_orbsmax', 'pl_bmasse', 'pl_rade', 'st_teff']].notna().all(axis=1)
+        kept = np.flatnonzero(complete.to_numpy())
+        df_final = df_clean.take(kept)
+        if stars is not None:
+            stars = (stars[0], stars[1][kept])
+    count("process.dropped_rows", len(df_clean) - len(df_final))
 
 
-    # 2 Physics
+    # 2 Physics, 3 Science: only the requested columns and what they depend on
+    Evaluator(df_final, stars=stars).compute(SCORE_COLUMNS if columns is None else columns)
 
+    print(f"Catalog: {len(df_final)} planets.")
+    return df_final
 
-    df_final['pl_density'] = df_final['pl_bmasse'] / (df_final['pl_rade'] ** 3)
-    df_final['insolation'] = (10 ** df_final['st_lum']) / (df_final['pl_orbsmax'] ** 2)
-    
-    # temperature
-    mask_no_temp = df_final['pl_eqt'].isnull()
-    df_final.loc[mask_no_temp, 'pl_eqt'] = df_final.loc[mask_no_temp, 'st_teff'] * np.sqrt(
-        df_final.loc[mask_no_temp, 'st_rad'] / (2 * df_final.loc[mask_no_temp, 'pl_orbsmax'] * 215.032)
-    )
-    
-    # Habitable zone
-    def classify_habitability(flux):
-        if flux > 1.11: return "Too Hot (Hot Zone)"
-        elif flux < 0.36: return "Too Cold (Cold Zone)"
-        else: return "Habitable Zone (Goldilocks)"
-    df_final['habitable_type'] = df_final['insolation'].apply(classify_habitability)
-
-    # ESI
-    def calculate_esi(radius, density, temp):
-        if pd.isna(temp): return 0
-        r_ref, d_ref, t_ref = 1.0, 1.0, 288.0
-        w_r, w_d, w_t = 0.57, 1.07, 5.58
-        esi_r = (1 - abs((radius - r_ref) / (radius + r_ref))) ** w_r
-        esi_d = (1 - abs((density - d_ref) / (density + d_ref))) ** w_d
-        esi_t = (1 - abs((temp - t_ref) / (temp + t_ref))) ** w_t
-        return (esi_r * esi_d * esi_t) ** (1/3)
-
-    df_final['ESI'] = df_final.apply(lambda row: calculate_esi(row['pl_rade'], row['pl_density'], row['pl_eqt']), axis=1)
-
-
-    # 3. Science
-
-
-    # A. Bio Class (Schulze-Makuch)
-    def classify_life(temp_k):
-        if pd.isna(temp_k): return "Unknown"
-        temp_c = temp_k - 273.15
-        if -18 <= temp_c <= 105: return "Complex Life Possible"
-        elif -18 <= temp_c <= 122: return "Microbial Life Only"
-        else: return "Extreme Environment"
-    df_final['Bio_Class'] = df_final['pl_eqt'].apply(classify_life)
-
-    # B. Atmosphere (Zahnle & Catling 2017)
-    df_final['v_esc'] = 11.186 * np.sqrt(df_final['pl_bmasse'] / df_final['pl_rade'])
-    def check_atmosphere(row):
-        if row['v_esc'] < 3.0: return "No Atmosphere (Likely)"
-        if row['insolation'] > (row['v_esc'] / 6.0) ** 4: return "Atmosphere Risk (Erosion)"
-        else: return "Atmosphere Likely"
-    df_final['Atmosphere_Class'] = df_final.apply(check_atmosphere, axis=1)
-
-    # C. Adams 2025 
-    def calculate_adams_score(row):
-        score = 0.0
-        temp_c = row['pl_eqt'] - 273.15
-        if not (0 <= temp_c <= 100): return 0.0
-        
-        score += 1.0
-        period = row['pl_orbper']
-        if pd.isna(period): return score
-        
-        if period < 20: score += 2.0 
-        else: score += 0.5
-        
-        if 10 <= period <= 20: score += 1.0
-        return score
-    
-    df_final['Adams_Score'] = df_final.apply(calculate_adams_score, axis=1)
+# Sharded mode: the catalog is split by hostname (a system never straddles
+# two shards), and the shards run through process_data in a process pool.
+# Only the columns process_data reads travel to the workers, as one Arrow
+# IPC stream in shared memory that every worker takes its rows from; each
+# result comes back the same way. The parent puts the rows back in their
+# original order and adds the untouched columns, so the output is
+# identical to the serial path.
 
+SHARD_COLUMNS = ['hostname', 'pl_rade', 'pl_bmasse', 'pl_orbper', 'pl_orbsmax', 'pl_eqt', 'st_mass', 'st_rad', 'st_teff', 'st_lum']
 
-    def categorize_adams(score):
-        if score >= 4.0: return "Prime Habitability (Adams 2025)"
-        elif score >= 2.0: return "Habitable (Fast Rotator)"
-        elif score > 0: return "Marginal (Slow Rotator)"
-        else: return "Not Habitable"
-        
-    df_final['Adams_Category'] = df_final['Adams_Score'].apply(categorize_adams)
+_shared = {}
 
 
-    # D. Final Score
-    df_final['AstroBiom_Score'] = (df_final['ESI'] * 10) + df_final['Adams_Score']
+def _to_shared(df, preserve_index=False):
+    # Arrow IPC stream written straight into a new shared memory block
+    table = pa.Table.from_pandas(df, preserve_index=preserve_index)
+    mock = pa.MockOutputStream()
+    with pa.ipc.new_stream(mock, table.schema) as writer:
+        writer.write_table(table)
+    size = mock.size()
 
-    print(f"Catalog: {len(df_final)} planets.")
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    try:
+        with pa.ipc.new_stream(pa.FixedSizeBufferWriter(pa.py_buffer(shm.buf)), table.schema) as writer:
+            writer.write_table(table)
+    except BaseException:
+        shm.close()
+        shm.unlink()
+        raise
+    return shm, size
+
+
+def _from_shared(name, size):
+    # copies the block out, then frees it
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        return pa.ipc.open_stream(bytes(shm.buf[:size])).read_all().to_pandas()
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _attach_catalog(name, size):
+    shm = shared_memory.SharedMemory(name=name)
+    _shared['shm'] = shm
+    _shared['table'] = pa.ipc.open_stream(pa.py_buffer(shm.buf[:size])).read_all()
+
+
+def _process_shard(positions, columns=None):
+    df = _shared['table'].take(positions).to_pandas().set_axis(positions)
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = process_data(df, columns)
+    shm, size = _to_shared(result, preserve_index=True)
+    shm.close()
+    return shm.name, size
+
+
+def shard_ids(df, n_shards):
+    # consecutive hosts per shard; planets without a hostname are their own system
+    hosts = df['hostname'].fillna(df['pl_name']) if 'hostname' in df.columns else df['pl_name']
+    codes, uniques = pd.factorize(hosts)
+    return codes * n_shards // max(len(uniques), 1)
+
+
+def process_sharded(df, workers=None, shards_per_worker=4, columns=None, stars=None):
+    # stars is only used on the serial path; each worker builds the table of its own shard
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return process_data(df, columns, stars=stars)
+
+    n_shards = workers * shards_per_worker
+    shards = shard_ids(df, n_shards)
+    order = np.argsort(shards, kind='stable')
+    bounds = np.searchsorted(shards[order], np.arange(n_shards + 1))
+
+    with timer("process.sharded", rows=len(df), workers=workers):
+        shm, size = _to_shared(df[[col for col in SHARD_COLUMNS if col in df.columns]])
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach_catalog, initargs=(shm.name, size)) as pool:
+                futures = [
+                    pool.submit(_process_shard, order[bounds[i]:bounds[i + 1]], columns)
+                    for i in range(n_shards) if bounds[i + 1] > bounds[i]
+                ]
+                parts = [_from_shared(*future.result()) for future in futures]
+        finally:
+            shm.close()
+            shm.unlink()
+
+        # original row order; computed columns replace or extend the input ones
+        computed = pd.concat(parts).sort_index()
+        df_final = df.take(computed.index.to_numpy())
+        for col in computed.columns:
+            df_final[col] = computed[col].set_axis(df_final.index)
+
+    print(f"Catalog: {len(df_final)} planets ({workers} workers, {len(parts)} shards).")
     return df_final
 
+
+# Incremental mode. Every raw row is fingerprinted by pl_name plus its raw
+# columns; only new or changed planets go through process_data again. The
+# manifest also records the version of the processing code, so results
+# computed by other code are never reused.
+
+def row_hashes(df):
+    raw_cols = [c for c in df.columns if not c.startswith('Unnamed') and c != 'row_hash']
+    # int64 view so the fingerprint survives a CSV round-trip exactly
+    return pd.util.hash_pandas_object(df[raw_cols], index=False).to_numpy().view('int64')
+
+
+def code_version():
+    # this file plus the output columns; any change invalidates stored results
+    digest = hashlib.sha256()
+    with open(os.path.abspath(__file__), "rb") as f:
+        digest.update(f.read())
+    digest.update(json.dumps(SCORE_COLUMNS).encode())
+    return digest.hexdigest()[:16]
+
+
+def manifest_frame(df_raw, hashes):
+    return pd.DataFrame({'pl_name': df_raw['pl_name'].to_numpy(), 'row_hash': hashes, 'code_version': code_version()})
+
+
+def results_reusable(df_prev, manifest):
+    # stored results were made by this code and have every output column
+    return (
+        'code_version' in manifest.columns
+        and bool((manifest['code_version'] == code_version()).all())
+        and all(col in df_prev.columns for col in SCORE_COLUMNS)
+    )
+
+
+def process_incremental(df_raw, df_prev, manifest, stars=None):
+    hashes = row_hashes(df_raw)
+    new_manifest = manifest_frame(df_raw, hashes)
+
+    old_hash = manifest.drop_duplicates('pl_name', keep='last').set_index('pl_name')['row_hash']
+    changed = (new_manifest['pl_name'].map(old_hash) != new_manifest['row_hash']).to_numpy()
+
+    # unchanged planets are reused as-is, deleted planets simply fall out here
+    unchanged_names = new_manifest.loc[~changed, 'pl_name']
+    df_keep = df_prev[df_prev['pl_name'].isin(unchanged_names)]
+
+    if stars is not None:
+        stars = (stars[0], stars[1][changed])
+    df_delta = process_data(df_raw[changed], stars=stars)
+    df_delta['row_hash'] = hashes[changed.nonzero()[0]][df_raw.index[changed].get_indexer(df_delta.index)]
+
+    # same row order as a full rebuild
+    position = pd.Series(np.arange(len(df_raw)), index=df_raw['pl_name'].to_numpy())
+    df_result = pd.concat([df_keep, df_delta], ignore_index=True)
+    df_result = df_result.iloc[np.argsort(df_result['pl_name'].map(position).to_numpy(), kind='stable')]
+    df_result = df_result.reset_index(drop=True)
+
+    print(f"Incremental: {int(changed.sum())} new/changed, {len(df_prev) - len(df_keep)} pruned or replaced.")
+    return df_result, new_manifest
+
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+RAW_FILE = os.path.join(current_dir, "data", "astrobiom_data.parquet")
+PROCESSED_FILE = os.path.join(current_dir, "data", "astrobiom_processed.parquet")
+MANIFEST_FILE = os.path.join(current_dir, "data", "astrobiom_manifest.parquet")
+STARS_FILE = os.path.join(current_dir, "data", "astrobiom_stars.parquet")
+
+
+def run_streaming(chunk_rows=100_000, csv=False, workers=1):
+    # Out-of-core mode: every step of process_data is row-local, so the raw
+    # catalog is processed chunk by chunk and the results are appended to the
+    # output as they come. Memory is bounded by the chunk size. A star whose
+    # planets straddle two chunks gets a row in the star table for each.
+    with DatasetWriter(PROCESSED_FILE, csv=csv) as out, DatasetWriter(MANIFEST_FILE) as manifest, \
+            DatasetWriter(STARS_FILE) as stars:
+        for df_raw in iter_dataset(RAW_FILE, chunk_rows=chunk_rows):
+            hashes = row_hashes(df_raw)
+            chunk_stars = star_table(df_raw)
+            stars.write(star_summary(*chunk_stars))
+            df_result = process_sharded(df_raw, workers=workers, stars=chunk_stars)
+            df_result['row_hash'] = pd.Series(hashes, index=df_raw.index)
+            out.write(df_result)
+            manifest.write(manifest_frame(df_raw, hashes))
+    print(f"Processed {manifest.rows} rows in chunks of {chunk_rows}: {out.rows} planets kept.")
+    return out.rows
+
+
+def run(incremental=False, csv=False, chunk_rows=None, workers=1):
+    if not dataset_exists(RAW_FILE):
+        print("Error: 'astrobiom_data' dataset not found")
+        return None
+
+    if chunk_rows:
+        if incremental:
+            # the incremental merge needs the previous output in memory
+            raise ValueError("incremental mode cannot be combined with chunk_rows")
+        return run_streaming(chunk_rows=chunk_rows, csv=csv, workers=workers)
+
+    df_raw = load_dataset(RAW_FILE)
+    # built once: the scoring broadcasts it and it is saved as the star table
+    stars = star_table(df_raw)
+
+    df_prev = manifest = None
+    if incremental and dataset_exists(PROCESSED_FILE) and dataset_exists(MANIFEST_FILE):
+        df_prev = load_dataset(PROCESSED_FILE)
+        manifest = load_dataset(MANIFEST_FILE)
+        if not results_reusable(df_prev, manifest):
+            print("Processing code or output columns changed since the last run: full rebuild.")
+            df_prev = manifest = None
+
+    if df_prev is not None:
+        df_result, manifest = process_incremental(df_raw, df_prev, manifest, stars=stars)
+    else:
+        hashes = row_hashes(df_raw)
+        df_result = process_sharded(df_raw, workers=workers, stars=stars)
+        df_result['row_hash'] = pd.Series(hashes, index=df_raw.index)
+        manifest = manifest_frame(df_raw, hashes)
+
+    print(f"Memory: raw catalog {memory_mb(df_raw):.1f} MB, processed {memory_mb(df_result):.1f} MB.")
+    save_dataset(df_result, PROCESSED_FILE, csv=csv)
+    save_dataset(manifest, MANIFEST_FILE)
+    save_dataset(star_summary(*stars), STARS_FILE)
+    return df_result
+
+
 if __name__ == "__main__":
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    RAW_FILE = os.path.join(current_dir, "data", "astrobiom_data.csv")
-    PROCESSED_FILE = os.path.join(current_dir, "data", "astrobiom_processed.csv")
-    
-    if os.path.exists(RAW_FILE):
-        df_raw = pd.read_csv(RAW_FILE)
-        df_result = process_data(df_raw)
-        df_result.to_csv(PROCESSED_FILE, index=False)
-        
-        
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="AstroBiom data processing")
+    parser.add_argument("--incremental", action="store_true", help="recompute only new or changed planets")
+    parser.add_argument("--csv", action="store_true", help="also write a CSV copy")
+    parser.add_argument("--chunk-rows", type=int, default=None, help="out-of-core mode: stream the catalog in chunks of this many rows")
+    parser.add_argument("--workers", type=int, default=1, help="processes for the scoring, sharded by hostname (0 = all cores)")
+    args = parser.parse_args()
+    if args.incremental and args.chunk_rows:
+        parser.error("--incremental needs the previous output in memory and cannot be combined with --chunk-rows")
+
+    run(incremental=args.incremental, csv=args.csv, chunk_rows=args.chunk_rows, workers=args.workers)
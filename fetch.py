@@ -0,0 +1,229 @@
+import datetime
+import io
+import json
+import os
+import time
+
+import pandas as pd
+import requests
+
+from metrics import METRICS, count
+
+
+TAP_URL = "https://exoplanetarchive.ipac.caltech.edu/TAP/sync"
+
+# documentation https://exoplanetarchive.ipac.caltech.edu/docs/API_PS_columns.html
+
+QUERY = """
+SELECT
+    pl_name,
+    hostname,
+    discoverymethod,
+    disc_year,
+    pl_rade, pl_radeerr1, pl_radeerr2,
+    pl_bmasse, pl_bmasseerr1, pl_bmasseerr2,
+    pl_orbper, pl_orbpererr1, pl_orbpererr2,
+    pl_orbsmax, pl_orbsmaxerr1, pl_orbsmaxerr2,
+    pl_orbeccen,
+    pl_eqt, pl_eqterr1, pl_eqterr2,
+    st_mass, st_masserr1, st_masserr2,
+    st_rad, st_raderr1, st_raderr2,
+    st_teff, st_tefferr1, st_tefferr2,
+    st_lum, st_lumerr1, st_lumerr2,
+    st_spectype,
+    sy_dist,
+    rowupdate
+FROM ps
+WHERE default_flag = 1
+"""
+
+
+def build_query(since=None):
+    # rowupdate is the archive's last-modified date (YYYY-MM-DD) for each row
+    if since is None:
+        return QUERY
+    since = datetime.date.fromisoformat(since).isoformat()
+    return QUERY.rstrip() + f" AND rowupdate >= '{since}'\n"
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class StaleDownload(requests.RequestException):
+    # the server content changed after part of it was already handed out
+    pass
+
+
+def _meta_file(part_file):
+    return part_file + ".json"
+
+
+def discard_partial(part_file):
+    for path in (part_file, _meta_file(part_file)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _resumable(part_file, url, params):
+    # A .part file is only resumed when its sidecar says it holds the start
+    # of this very query and has a validator to send with If-Range
+    if not os.path.exists(part_file) or not os.path.exists(_meta_file(part_file)):
+        return None
+    try:
+        with open(_meta_file(part_file)) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("url") != url or meta.get("params") != params or not (meta.get("etag") or meta.get("last_modified")):
+        return None
+    return meta
+
+
+def _replay(part_file, start, end, chunk_size):
+    with open(part_file, "rb") as f:
+        f.seek(start)
+        while start < end and (chunk := f.read(min(chunk_size, end - start))):
+            start += len(chunk)
+            count("fetch.bytes", len(chunk), source="part_file")
+            yield chunk
+
+
+def stream_chunks(url, params, part_file, retries=5, backoff=1.0, chunk_size=1 << 16, timeout=60):
+    # Yields the response body chunk by chunk while appending it to part_file.
+    # A .part file left by an interrupted run of the same query is resumed
+    # with Range + If-Range; its bytes are replayed only once the server has
+    # confirmed (206) that they still match. A 200 instead means the content
+    # changed: the partial file is dropped and the download starts over, or
+    # StaleDownload is raised when part of the old body was already yielded.
+    meta = _resumable(part_file, url, params)
+    if meta is None:
+        discard_partial(part_file)
+    received = os.path.getsize(part_file) if meta else 0
+    yielded = 0
+
+    attempt = 0
+    while True:
+        headers = {"Accept-Encoding": "gzip, deflate"}
+        if received:
+            # byte offsets only line up with the uncompressed body
+            headers = {"Accept-Encoding": "identity", "Range": f"bytes={received}-"}
+            # without a validator (a reconnect within this run) the Content-Range check is all we have
+            validator = meta.get("etag") or meta.get("last_modified")
+            if validator:
+                headers["If-Range"] = validator
+
+        try:
+            with requests.get(url, params=params, headers=headers, stream=True, timeout=timeout) as response:
+                if response.status_code == 416 and received:
+                    # the .part file already holds the whole body
+                    yield from _replay(part_file, yielded, received, chunk_size)
+                    return
+                if response.status_code in RETRY_STATUS:
+                    raise requests.ConnectionError(f"Server error {response.status_code}")
+                response.raise_for_status()
+
+                resumed = response.status_code == 206 and response.headers.get(
+                    "Content-Range", "").startswith(f"bytes {received}-")
+                if received and not resumed:
+                    # changed on the server, or Range ignored: start over
+                    discard_partial(part_file)
+                    if yielded:
+                        raise StaleDownload(f"{url} changed during the download")
+                    received = 0
+
+                if not received:
+                    meta = {
+                        "url": url, "params": params,
+                        "etag": response.headers.get("ETag"),
+                        "last_modified": response.headers.get("Last-Modified"),
+                    }
+                    with open(_meta_file(part_file), "w") as f:
+                        json.dump(meta, f)
+                else:
+                    yield from _replay(part_file, yielded, received, chunk_size)
+                    yielded = received
+
+                with open(part_file, "ab" if received else "wb") as out:
+                    try:
+                        for chunk in response.iter_content(chunk_size=chunk_size):
+                            out.write(chunk)
+                            received += len(chunk)
+                            yielded += len(chunk)
+                            count("fetch.bytes", len(chunk), source="network")
+                            attempt = 0
+                            yield chunk
+                    finally:
+                        out.flush()
+                return
+
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError):
+            attempt += 1
+            count("fetch.retries")
+            if attempt > retries:
+                raise
+            time.sleep(backoff * 2 ** (attempt - 1))
+
+
+class ChunkReader(io.RawIOBase):
+    # file-like view over a chunk generator, so pandas can parse while downloading
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.buffer = b""
+        # time spent waiting for the next chunk (network, retries)
+        self.wait_seconds = 0.0
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        while not self.buffer:
+            start = time.perf_counter()
+            try:
+                self.buffer = next(self.chunks)
+            except StopIteration:
+                return 0
+            finally:
+                self.wait_seconds += time.perf_counter() - start
+        size = min(len(target), len(self.buffer))
+        target[:size] = self.buffer[:size]
+        self.buffer = self.buffer[size:]
+        return size
+
+
+def _download(part_file, params, url, **kwargs):
+    chunks = ChunkReader(stream_chunks(url, params, part_file, **kwargs))
+    start = time.perf_counter()
+    df = pd.read_csv(io.BufferedReader(chunks, buffer_size=1 << 16))
+
+    # download and parsing overlap; parse time is what is left of the total
+    elapsed = time.perf_counter() - start
+    METRICS.observe("fetch.download", chunks.wait_seconds)
+    METRICS.observe("fetch.parse", elapsed - chunks.wait_seconds, rows=len(df))
+    return df
+
+
+def fetch_catalog(dest, query=QUERY, url=TAP_URL, **kwargs):
+    # Downloads the TAP result to dest (CSV) and returns it parsed.
+    part_file = dest + ".part"
+    folder = os.path.dirname(dest)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+
+    params = {"query": query, "format": "csv"}
+    try:
+        try:
+            df = _download(part_file, params, url, **kwargs)
+        except StaleDownload:
+            # the partial file is gone by now, so this run starts from scratch
+            df = _download(part_file, params, url, **kwargs)
+    except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError):
+        # network trouble: the partial file is kept for the next run
+        raise
+    except Exception:
+        # a body that does not parse must not be resumed by the next run
+        discard_partial(part_file)
+        raise
+
+    os.replace(part_file, dest)
+    discard_partial(part_file)
+    return df
@@ -0,0 +1,126 @@
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+
+
+# Figures for the three theory tabs. Scatters use WebGL; above MAX_POINTS
+# the points are either sampled down or binned on the server into a density
+# heatmap, so the payload sent to the browser stays bounded.
+
+MAX_POINTS = 20000
+
+BIO_COLORS = {"Complex Life Possible": "green", "Microbial Life Only": "orange", "Extreme Environment": "red", "Unknown": "gray"}
+ATMOSPHERE_COLORS = {"Atmosphere Likely": "green", "Atmosphere Risk (Erosion)": "orange", "No Atmosphere (Likely)": "red"}
+ADAMS_COLORS = {"Prime Habitability (Adams 2025)": "green", "Habitable (Fast Rotator)": "blue", "Marginal (Slow Rotator)": "gray", "Not Habitable": "red"}
+
+
+def sample_points(df, max_points=MAX_POINTS):
+    if len(df) <= max_points:
+        return df
+    return df.sample(n=max_points, random_state=0)
+
+
+def sampled_title(title, df, max_points=MAX_POINTS):
+    if len(df) <= max_points:
+        return title
+    return f"{title} ({max_points:,} of {len(df):,} planets shown)"
+
+
+def density_figure(x, y, title, log_x=False, log_y=False, x_range=None, y_range=None, bins=200):
+    # 2D histogram computed here; only the bin counts go to the browser
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    keep = np.isfinite(x) & np.isfinite(y)
+    if log_x:
+        keep &= x > 0
+    if log_y:
+        keep &= y > 0
+    x, y = x[keep], y[keep]
+    if log_x:
+        x = np.log10(x)
+    if log_y:
+        y = np.log10(y)
+
+    counts, x_edges, y_edges = np.histogram2d(x, y, bins=bins, range=[x_range, y_range] if x_range and y_range else None)
+    x_centers = (x_edges[:-1] + x_edges[1:]) / 2
+    y_centers = (y_edges[:-1] + y_edges[1:]) / 2
+    if log_x:
+        x_centers = 10 ** x_centers
+    if log_y:
+        y_centers = 10 ** y_centers
+
+    fig = go.Figure(go.Heatmap(
+        x=x_centers, y=y_centers, z=np.where(counts.T > 0, counts.T, np.nan),
+        colorscale="Viridis", colorbar=dict(title="Planets")
+    ))
+    fig.update_layout(title=title)
+    if log_x:
+        fig.update_xaxes(type="log")
+    if log_y:
+        fig.update_yaxes(type="log")
+    return fig
+
+
+def bio_figure(df, lod="sample"):
+    title = "Insolation vs Surface Temperature (°C)"
+    temp_c = df['pl_eqt'] - 273.15
+
+    if lod == "density" and len(df) > MAX_POINTS:
+        fig = density_figure(df['insolation'], temp_c, title, log_x=True)
+    else:
+        df_plot = sample_points(df).assign(temp_c=temp_c)
+        fig = px.scatter(
+            df_plot, x="insolation", y="temp_c", color="Bio_Class",
+            color_discrete_map=BIO_COLORS, log_x=True,
+            hover_name="pl_name",
+            hover_data={"insolation": True, "temp_c": ":.1f", "Bio_Class": True},
+            title=sampled_title(title, df), render_mode="webgl"
+        )
+    fig.update_yaxes(range=[-150, 400])
+    fig.add_hline(y=-18, line_dash="dash", line_color="blue", annotation_text="-18°C")
+    fig.add_hline(y=105, line_dash="dash", line_color="green", annotation_text="+105°C")
+    fig.add_hline(y=122, line_dash="dash", line_color="orange", annotation_text="+122°C")
+    return fig
+
+
+def atmosphere_figure(df, lod="sample"):
+    title = "Insolation vs Escape Velocity"
+
+    if lod == "density" and len(df) > MAX_POINTS:
+        fig = density_figure(df['insolation'], df['v_esc'], title, log_x=True, log_y=True)
+    else:
+        fig = px.scatter(
+            sample_points(df), x="insolation", y="v_esc", color="Atmosphere_Class",
+            log_x=True, log_y=True, hover_name="pl_name",
+            title=sampled_title(title, df), render_mode="webgl",
+            color_discrete_map=ATMOSPHERE_COLORS
+        )
+    x_line = [0.1, 1, 10, 100, 1000, 10000]
+    y_line = [6 * (i**0.25) for i in x_line]
+    fig.add_trace(go.Scatter(x=x_line, y=y_line, mode='lines', name='Limit', line=dict(color='red', dash='dash')))
+    return fig
+
+
+def adams_figure(df, lod="sample"):
+    title = "Rotation Period vs Temperature"
+
+    if lod == "density" and len(df) > MAX_POINTS:
+        fig = density_figure(df['pl_orbper'], df['pl_eqt'], title, x_range=[0, 50], y_range=[-100, 200])
+    else:
+        fig = px.scatter(
+            sample_points(df), x="pl_orbper", y="pl_eqt", color="Adams_Category",
+            hover_name="pl_name", hover_data=["AstroBiom_Score"],
+            title=sampled_title(title, df), render_mode="webgl",
+            color_discrete_map=ADAMS_COLORS
+        )
+    fig.update_xaxes(range=[0, 50])
+    fig.update_yaxes(range=[-100, 200])
+    fig.add_shape(type="rect", x0=0, y0=0, x1=20, y1=100, line=dict(color="green", width=2), fillcolor="green", opacity=0.1)
+    return fig
+
+
+FIGURES = {
+    "bio": bio_figure,
+    "atmosphere": atmosphere_figure,
+    "adams": adams_figure,
+}
@@ -0,0 +1,222 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+import pandas as pd
+
+from metrics import METRICS, count, timer
+
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+RESPONSE_CACHE_FILE = os.path.join(current_dir, "data", "llm_cache.sqlite")
+FINAL_FILE = os.path.join(current_dir, "data", "astrobiom_final.parquet")
+
+MODEL_NAME = 'gemini-2.5-flash'
+REQUEST_TIMEOUT = 60
+
+PROFILE_TEMPLATE = """
+            You are an expert astrobiologist. Describe the exoplanet {planet_name}.
+            AstroBiom data:
+            - Mass: {mass} M_earth
+            - Radius: {radius} R_earth
+            - Temperature: {temp} K
+            - Orbital Period: {period} d
+            - ESI: {esi:.2f}
+            - AstroBiom Score: {score:.1f}
+            - Category (Adams): {adams}
+            - Type (ML): {planet_type}
+
+            1. Is it habitable?
+            2. Role of rotation (according to Adams).
+            3. Conclusion. Use emojis.
+            """
+
+
+def profile_prompt(planet_name, planet_data):
+    return PROFILE_TEMPLATE.format(
+        planet_name=planet_name,
+        mass=planet_data.get('pl_bmasse', 'N/A'),
+        radius=planet_data.get('pl_rade', 'N/A'),
+        temp=planet_data.get('pl_eqt', 'N/A'),
+        period=planet_data.get('pl_orbper', 'N/A'),
+        esi=planet_data.get('ESI', 0),
+        score=planet_data.get('AstroBiom_Score', 0),
+        adams=planet_data.get('Adams_Category', 'N/A'),
+        planet_type=planet_data.get('Planet_Type_ML', 'N/A'),
+    )
+
+
+def _plain(value):
+    # numpy scalars as Python values and NaN / NA as None, so any row
+    # (float32 NaNs of a compacted catalog included) serializes the same way
+    if not isinstance(value, str) and pd.isna(value):
+        return None
+    if hasattr(value, "item"):
+        value = value.item()
+    return value if isinstance(value, (bool, int, float, str)) else str(value)
+
+
+def profile_key(planet_data, template=PROFILE_TEMPLATE, model_name=MODEL_NAME):
+    # same planet row + same prompt template + same model -> same profile
+    digest = hashlib.sha256()
+    digest.update(model_name.encode())
+    digest.update(template.encode())
+    row = {str(col): _plain(value) for col, value in planet_data.items()}
+    digest.update(json.dumps(row, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    # Disk-backed LRU of generated texts (SQLite, so every Streamlit worker
+    # and the batch job share it). Oldest-used entries go past max_entries.
+
+    def __init__(self, path=RESPONSE_CACHE_FILE, max_entries=5000):
+        self.path = path
+        self.max_entries = max_entries
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, text TEXT, last_used REAL)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, key):
+        with self._connect() as conn:
+            row = conn.execute("SELECT text FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            return row[0]
+
+    def put(self, key, text):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?)", (key, text, time.time()))
+            conn.execute(
+                "DELETE FROM responses WHERE key NOT IN (SELECT key FROM responses ORDER BY last_used DESC LIMIT ?)",
+                (self.max_entries,)
+            )
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+def stream_text(model, prompt, timeout=REQUEST_TIMEOUT):
+    # Yields the answer chunk by chunk as the model produces it. Closing the
+    # generator (a Streamlit rerun does, through write_stream) stops reading
+    # and closes the response; raises TimeoutError past `timeout` seconds.
+    start = time.perf_counter()
+    deadline = time.monotonic() + timeout
+    response = model.generate_content(prompt, stream=True, request_options={"timeout": timeout})
+    chunks = iter(response)
+    first = True
+    try:
+        for chunk in chunks:
+            if time.monotonic() > deadline:
+                count("llm.stream_timeouts")
+                raise TimeoutError(f"No complete answer after {timeout} s")
+            text = chunk.text
+            if text:
+                if first:
+                    METRICS.observe("llm.first_chunk", time.perf_counter() - start)
+                    first = False
+                yield text
+    except GeneratorExit:
+        count("llm.stream_cancelled")
+        raise
+    finally:
+        METRICS.observe("llm.stream", time.perf_counter() - start)
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+
+def stream_profile(model, planet_name, planet_data, cache=None, timeout=REQUEST_TIMEOUT):
+    # cached profiles come back in one piece; fresh ones are streamed and
+    # stored only when the whole answer arrived (a timeout or a closed
+    # generator never reaches the put)
+    key = profile_key(planet_data)
+    if cache is not None:
+        text = cache.get(key)
+        count("llm.cache", result="miss" if text is None else "hit")
+        if text is not None:
+            yield text
+            return
+
+    parts = []
+    for text in stream_text(model, profile_prompt(planet_name, planet_data), timeout=timeout):
+        parts.append(text)
+        yield text
+
+    if cache is not None:
+        cache.put(key, "".join(parts))
+
+
+async def _generate_async(model, prompt):
+    with timer("llm.generate", kind="pregenerate"):
+        if hasattr(model, "generate_content_async"):
+            response = await model.generate_content_async(prompt)
+        else:
+            response = await asyncio.to_thread(model.generate_content, prompt)
+    return response.text
+
+
+async def pregenerate_profiles(df, model, cache, top_n=50, concurrency=4):
+    # profiles for the top-N AstroBiom_Score planets, at most `concurrency` requests in flight
+    top = df.sort_values(by='AstroBiom_Score', ascending=False).head(top_n)
+    semaphore = asyncio.Semaphore(concurrency)
+    counts = {"cached": 0, "generated": 0, "failed": 0}
+
+    async def one(planet_data):
+        # one bad row is counted as failed instead of aborting the batch
+        try:
+            key = profile_key(planet_data)
+            if cache.get(key) is not None:
+                counts["cached"] += 1
+                return
+            async with semaphore:
+                text = await _generate_async(model, profile_prompt(planet_data['pl_name'], planet_data))
+            cache.put(key, text)
+        except Exception as e:
+            print(f"Error for {planet_data['pl_name']}: {e}")
+            counts["failed"] += 1
+            return
+        counts["generated"] += 1
+
+    await asyncio.gather(*(one(row) for _, row in top.iterrows()))
+    return counts
+
+
+if __name__ == "__main__":
+    import google.generativeai as genai
+    from dotenv import load_dotenv
+
+    from storage import load_dataset, compact
+
+    parser = argparse.ArgumentParser(description="Pre-generate AI profiles for the top candidates")
+    parser.add_argument("--top", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    load_dotenv()
+    GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+    df = load_dataset(FINAL_FILE)
+    if df is not None:
+        # same dtypes as the dashboard's catalog, so the profile keys match
+        df = compact(df)
+
+    if not GOOGLE_API_KEY:
+        print("Error: GOOGLE_API_KEY not set")
+    elif df is None:
+        print("Error: 'astrobiom_final' dataset not found")
+    else:
+        genai.configure(api_key=GOOGLE_API_KEY)
+        model = genai.GenerativeModel(MODEL_NAME)
+        counts = asyncio.run(pregenerate_profiles(df, model, ResponseCache(), top_n=args.top, concurrency=args.concurrency))
+        print(f"Profiles: {counts['generated']} generated, {counts['cached']} already cached, {counts['failed']} failed.")
@@ -0,0 +1,155 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# Lightweight instrumentation shared by the pipeline scripts and the
+# dashboard. Timers and counters go into one registry per process; every
+# finished timer is also kept as an event (wall time, rows, peak RSS) so a
+# run can be exported as JSON lines or scraped in Prometheus text format.
+
+PREFIX = "astrobiom"
+
+
+def peak_rss_mb():
+    # high-water mark of the whole process, None where unsupported
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Metrics:
+
+    def __init__(self, max_events=10000):
+        self.lock = threading.Lock()
+        self.events = deque(maxlen=max_events)
+        self.timers = defaultdict(lambda: {"count": 0, "seconds": 0.0, "max_seconds": 0.0, "rows": 0})
+        self.counters = defaultdict(float)
+
+    @contextmanager
+    def timer(self, name, rows=None, **labels):
+        # rows may also be filled in by the block: `with timer(...) as t: t["rows"] = n`
+        info = {"rows": rows}
+        start = time.perf_counter()
+        try:
+            yield info
+        finally:
+            self.observe(name, time.perf_counter() - start, rows=info["rows"], **labels)
+
+    def observe(self, name, seconds, rows=None, **labels):
+        event = {"ts": time.time(), "name": name, "seconds": seconds, **labels}
+        if rows is not None:
+            event["rows"] = int(rows)
+        peak = peak_rss_mb()
+        if peak is not None:
+            event["peak_rss_mb"] = peak
+
+        with self.lock:
+            self.events.append(event)
+            stats = self.timers[(name, _label_key(labels))]
+            stats["count"] += 1
+            stats["seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            stats["rows"] += int(rows or 0)
+
+    def count(self, name, value=1, **labels):
+        with self.lock:
+            self.counters[(name, _label_key(labels))] += value
+
+    def reset(self):
+        with self.lock:
+            self.events.clear()
+            self.timers.clear()
+            self.counters.clear()
+
+    def summary(self):
+        # one row per timer (name + labels), for tables and the debug panel
+        with self.lock:
+            rows = []
+            for (name, labels), stats in sorted(self.timers.items()):
+                rows.append({"name": name, **dict(labels), **stats,
+                             "mean_seconds": stats["seconds"] / stats["count"]})
+            return rows
+
+    def to_jsonl(self):
+        with self.lock:
+            events = list(self.events)
+            counters = [{"ts": time.time(), "counter": name, "value": value, **dict(labels)}
+                        for (name, labels), value in sorted(self.counters.items())]
+        return "".join(json.dumps(line) + "\n" for line in events + counters)
+
+    def write_jsonl(self, path):
+        # appends, so several runs can share one file
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        with open(path, "a") as f:
+            f.write(self.to_jsonl())
+
+    def to_prometheus(self):
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            if not samples:
+                return
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{PREFIX}_{name}{_prometheus_labels(labels)} {float(value)!r}")
+
+        with self.lock:
+            timers = sorted(self.timers.items())
+            counters = sorted(self.counters.items())
+
+        def stage(name, labels):
+            return (("stage", name),) + labels
+
+        metric("stage_seconds_total", "counter", "Wall time spent in the stage.",
+               [(stage(n, l), s["seconds"]) for (n, l), s in timers])
+        metric("stage_calls_total", "counter", "Times the stage ran.",
+               [(stage(n, l), s["count"]) for (n, l), s in timers])
+        metric("stage_rows_total", "counter", "Rows handled by the stage.",
+               [(stage(n, l), s["rows"]) for (n, l), s in timers])
+        metric("stage_seconds_max", "gauge", "Slowest single run of the stage.",
+               [(stage(n, l), s["max_seconds"]) for (n, l), s in timers])
+        metric("events_total", "counter", "Counted events.",
+               [((("event", n),) + l, v) for (n, l), v in counters])
+        peak = peak_rss_mb()
+        if peak is not None:
+            metric("peak_rss_bytes", "gauge", "Peak resident memory of the process.", [((), peak * 2**20)])
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        # textfile-collector style: written whole, then swapped in
+        tmp_file = path + ".tmp"
+        with open(tmp_file, "w") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_file, path)
+
+
+def _prometheus_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in labels)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+
+# process-wide registry used by every module
+METRICS = Metrics()
+timer = METRICS.timer
+count = METRICS.count
@@ -0,0 +1,91 @@
+import os
+import pickle
+
+import numpy as np
+
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+NEIGHBORS_FILE = os.path.join(current_dir, "data", "neighbors.pkl")
+
+FILTER_COLUMNS = ['habitable_type', 'Planet_Type_ML']
+
+
+# "Planets like this": a KD-tree over the same standardized features the
+# clustering model uses, saved next to the cluster model so queries never
+# touch the full table.
+
+class NeighborIndex:
+
+    def __init__(self, df, model):
+        # sklearn only when an index is built (or unpickled), not on import
+        from sklearn.neighbors import KDTree
+
+        X = df[model['features']].dropna()
+        self.features = model['features']
+        self.model_version = model['version']
+        self.mean = np.array(model['mean'])
+        self.scale = np.array(model['scale'])
+        self.tree = KDTree((X.to_numpy() - self.mean) / self.scale)
+
+        self.names = df.loc[X.index, 'pl_name'].to_numpy(dtype=object)
+        self.positions = {name: i for i, name in reversed(list(enumerate(self.names)))}
+        self.labels = {
+            col: df.loc[X.index, col].astype(object).to_numpy()
+            for col in FILTER_COLUMNS if col in df.columns
+        }
+
+    def __len__(self):
+        return len(self.names)
+
+    def point(self, name):
+        i = self.positions[name]
+        return np.asarray(self.tree.data[i])
+
+    def _mask(self, ids, filters):
+        keep = np.ones(len(ids), dtype=bool)
+        for col, values in filters.items():
+            if values:
+                keep &= np.isin(self.labels[col][ids], list(values))
+        return keep
+
+    def _result(self, ids, distances, exclude):
+        return [
+            {"pl_name": self.names[i], "distance": float(d)}
+            for i, d in zip(ids, distances) if self.names[i] != exclude
+        ]
+
+    def nearest(self, name, k=10, **filters):
+        # k closest planets to `name`, optionally only those whose
+        # habitable_type / Planet_Type_ML is in the given lists
+        target = self.point(name)[None, :]
+        want = k + 1
+        fetch = want if not any(filters.values()) else want * 4
+        while True:
+            fetch = min(fetch, len(self))
+            distances, ids = self.tree.query(target, k=fetch)
+            distances, ids = distances[0], ids[0]
+            keep = self._mask(ids, filters)
+            if keep.sum() >= want or fetch == len(self):
+                break
+            fetch *= 4
+        return self._result(ids[keep], distances[keep], exclude=name)[:k]
+
+    def within(self, name, radius, **filters):
+        # every planet inside `radius` (in standardized units), closest first
+        target = self.point(name)[None, :]
+        ids, distances = self.tree.query_radius(target, r=radius, return_distance=True, sort_results=True)
+        ids, distances = ids[0], distances[0]
+        keep = self._mask(ids, filters)
+        return self._result(ids[keep], distances[keep], exclude=name)
+
+
+def save_index(index, path=NEIGHBORS_FILE):
+    with open(path, "wb") as f:
+        pickle.dump(index, f)
+
+
+def load_index(path=NEIGHBORS_FILE):
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return pickle.load(f)
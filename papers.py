@@ -0,0 +1,213 @@
+import argparse
+import glob
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import re
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+PAPERS_DIR = os.path.join(current_dir, "papers")
+INDEX_FILE = os.path.join(current_dir, "data", "papers_index.json")
+TEXT_CACHE_DIR = os.path.join(current_dir, "data", "papers_text")
+
+CHUNK_WORDS = 250
+CHUNK_OVERLAP = 50
+
+STOPWORDS = set("""
+a an and are as at be by for from has have in is it its of on or that the their this to was were which with
+we our can not but also these those than then there they into such may more most other only been being how
+what when where who why will would
+""".split())
+
+
+# Local retrieval for the "AI with papers" chat: the paper text is split into
+# overlapping chunks, indexed with BM25 and persisted next to the data. Only
+# the top-k chunks for a question are sent to the model.
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(1 << 20):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def tokenize(text):
+    return [t for t in re.findall(r"[a-z0-9]+", text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+def extract_pages(path):
+    # pypdf is only needed when a PDF is (re-)extracted, not to search the index
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    return [page.extract_text() or "" for page in reader.pages]
+
+
+def _extract_to_cache(path, cache_file):
+    # runs in a worker process; the page text lands in the on-disk cache
+    pages = extract_pages(path)
+    tmp_file = cache_file + ".tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(pages, f)
+    os.replace(tmp_file, cache_file)
+    return pages
+
+
+def extract_all(paths, cache_dir=TEXT_CACHE_DIR, workers=None):
+    # Page text for every PDF, keyed by file content hash on disk so cold
+    # starts and other workers reuse it. Only uncached PDFs are parsed, in a
+    # process pool. Returns {path: (sha256, pages)}; unreadable PDFs are left out.
+    if not os.path.exists(cache_dir):
+        os.makedirs(cache_dir)
+
+    results = {}
+    missing = {}
+    for path in paths:
+        sha = file_sha256(path)
+        cache_file = os.path.join(cache_dir, sha + ".json")
+        if os.path.exists(cache_file):
+            with open(cache_file) as f:
+                results[path] = (sha, json.load(f))
+        else:
+            missing[path] = (sha, cache_file)
+
+    if len(missing) == 1:
+        # not worth a pool
+        path, (sha, cache_file) = next(iter(missing.items()))
+        try:
+            results[path] = (sha, _extract_to_cache(path, cache_file))
+        except Exception as e:
+            print(f"Error reading {os.path.basename(path)}: {e}")
+    elif missing:
+        # spawn, not fork: the dashboard calls this from a threaded server,
+        # and a forked child can inherit a lock another thread was holding
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = {path: pool.submit(_extract_to_cache, path, cache_file) for path, (sha, cache_file) in missing.items()}
+            for path, future in futures.items():
+                try:
+                    results[path] = (missing[path][0], future.result())
+                except Exception as e:
+                    print(f"Error reading {os.path.basename(path)}: {e}")
+
+    return results
+
+
+def chunk_pages(pages, source):
+    chunks = []
+    for page_number, text in enumerate(pages, start=1):
+        words = text.split()
+        step = CHUNK_WORDS - CHUNK_OVERLAP
+        for start in range(0, max(len(words) - CHUNK_OVERLAP, 1), step):
+            piece = " ".join(words[start:start + CHUNK_WORDS])
+            if piece:
+                chunks.append({"source": source, "page": page_number, "text": piece})
+    return chunks
+
+
+def papers_version(papers_dir=PAPERS_DIR):
+    # cheap signature that changes when a PDF is added, removed or rewritten
+    paths = sorted(glob.glob(os.path.join(papers_dir, "*.pdf")))
+    return tuple((os.path.basename(p), os.stat(p).st_mtime_ns, os.stat(p).st_size) for p in paths)
+
+
+def update_index(papers_dir=PAPERS_DIR, index_file=INDEX_FILE):
+    # re-extracts only the PDFs whose content hash changed; removed PDFs drop out
+    stored = {}
+    if os.path.exists(index_file):
+        with open(index_file) as f:
+            stored = json.load(f).get("files", {})
+
+    paths = sorted(glob.glob(os.path.join(papers_dir, "*.pdf")))
+    stale = []
+    for path in paths:
+        name = os.path.basename(path)
+        if name not in stored or stored[name]["sha256"] != file_sha256(path):
+            stale.append(path)
+    extracted = extract_all(stale)
+
+    files = {}
+    changed = bool(extracted)
+    for path in paths:
+        name = os.path.basename(path)
+        if path in extracted:
+            sha, pages = extracted[path]
+            files[name] = {"sha256": sha, "chunks": chunk_pages(pages, name)}
+        elif path not in stale:
+            files[name] = stored[name]
+
+    if changed or set(files) != set(stored):
+        folder = os.path.dirname(index_file)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        with open(index_file, "w") as f:
+            json.dump({"files": files}, f)
+
+    return PaperIndex([chunk for name in sorted(files) for chunk in files[name]["chunks"]])
+
+
+class PaperIndex:
+    # BM25 (k1=1.5, b=0.75) over the chunks, with an inverted index so a
+    # query only touches chunks that share a term with it
+
+    def __init__(self, chunks, k1=1.5, b=0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self.lengths = []
+        self.postings = defaultdict(list)
+        for i, chunk in enumerate(chunks):
+            counts = Counter(tokenize(chunk["text"]))
+            self.lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings[term].append((i, tf))
+        self.avg_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def search(self, query, k=5):
+        n = len(self.chunks)
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for i, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[i] / self.avg_length)
+                scores[i] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [dict(self.chunks[i], score=score) for i, score in best]
+
+
+def format_context(results):
+    parts = [f"[{n}] {r['source']}, p. {r['page']}\n{r['text']}" for n, r in enumerate(results, start=1)]
+    return "\n\n".join(parts)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the paper index and run a query against it")
+    parser.add_argument("query", nargs="?", default=None)
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = update_index()
+    print(f"Index: {len(index)} chunks ({time.perf_counter() - start:.2f} s)")
+
+    if args.query:
+        start = time.perf_counter()
+        results = index.search(args.query, k=args.k)
+        elapsed = (time.perf_counter() - start) * 1000
+        for r in results:
+            print(f"{r['score']:6.2f}  {r['source']} p.{r['page']}: {r['text'][:100]}...")
+        print(f"Query: {elapsed:.1f} ms")
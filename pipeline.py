@@ -0,0 +1,159 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import data_load
+import data_ml
+import data_processor
+from metrics import METRICS
+
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+CACHE_FILE = os.path.join(current_dir, "data", "pipeline_cache.json")
+
+
+# The pipeline as a DAG. A stage is skipped when the hash of its code files
+# and input files matches the one stored after its last successful run and
+# all of its outputs are still on disk.
+
+STAGES = {
+    "load": {
+        "deps": [],
+        "run": data_load.get_data,
+        "code": ["data_load.py", "fetch.py", "storage.py"],
+        "inputs": [],
+        "outputs": [data_load.RAW_FILE],
+    },
+    "process": {
+        "deps": ["load"],
+        "run": data_processor.run,
+        "code": ["data_processor.py", "storage.py"],
+        "inputs": [data_processor.RAW_FILE],
+        "outputs": [data_processor.PROCESSED_FILE, data_processor.MANIFEST_FILE, data_processor.STARS_FILE],
+    },
+    "cluster": {
+        "deps": ["process"],
+        "run": data_ml.run,
+        "code": ["data_ml.py", "neighbors.py", "storage.py"],
+        "inputs": [data_ml.INPUT_FILE],
+        "outputs": [data_ml.OUTPUT_FILE, data_ml.MODEL_FILE, data_ml.NEIGHBORS_FILE],
+    },
+}
+
+
+def file_hash(path, digest):
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            digest.update(chunk)
+
+
+def stage_key(stage):
+    digest = hashlib.sha256()
+    for name in stage["code"]:
+        file_hash(os.path.join(current_dir, name), digest)
+    for path in stage["inputs"]:
+        if os.path.exists(path):
+            file_hash(path, digest)
+    return digest.hexdigest()
+
+
+def load_cache():
+    if os.path.exists(CACHE_FILE):
+        with open(CACHE_FILE) as f:
+            return json.load(f)
+    return {}
+
+
+def save_cache(cache):
+    with open(CACHE_FILE, "w") as f:
+        json.dump(cache, f, indent=2)
+
+
+def run_stage(name, stage, cache, force):
+    start = time.perf_counter()
+    key = stage_key(stage)
+    outputs_ready = all(os.path.exists(path) for path in stage["outputs"])
+
+    if name not in force and cache.get(name) == key and outputs_ready:
+        return {"stage": name, "status": "hit", "seconds": time.perf_counter() - start, "key": key}
+
+    # peak memory is process-wide: stages running side by side share one peak
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+    started_at = time.time()
+    stage["run"]()
+    for path in stage["outputs"]:
+        if not os.path.exists(path) or os.path.getmtime(path) < started_at - 1:
+            raise RuntimeError(f"Stage '{name}' did not write {os.path.basename(path)}")
+    result = {"stage": name, "status": "miss", "seconds": time.perf_counter() - start, "key": key}
+    if tracemalloc.is_tracing():
+        result["peak_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+    METRICS.observe(f"pipeline.{name}", result["seconds"])
+    return result
+
+
+def run_pipeline(stages=STAGES, force=(), workers=4, memory=False):
+    # memory=True traces allocations and reports the peak of every stage run
+    if memory:
+        tracemalloc.start()
+    cache = load_cache()
+    pending = dict(stages)
+    running = {}
+    done = set()
+    report = []
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            # start every stage whose dependencies are finished
+            for name, stage in list(pending.items()):
+                if all(dep in done for dep in stage["deps"]):
+                    running[pool.submit(run_stage, name, stage, cache, force)] = name
+                    del pending[name]
+
+            if not running:
+                raise RuntimeError(f"Unresolvable dependencies: {sorted(pending)}")
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                result = future.result()
+                done.add(name)
+                report.append(result)
+
+                cache[name] = result["key"]
+                save_cache(cache)
+
+    if memory:
+        tracemalloc.stop()
+
+    for result in report:
+        line = f"{result['stage']:<10} {result['status']:<5} {result['seconds']:8.2f} s"
+        if "peak_mb" in result:
+            line += f"  {result['peak_mb']:8.1f} MB peak"
+        print(line)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the AstroBiom pipeline (load -> process -> cluster)")
+    parser.add_argument("--force", nargs="*", default=[], choices=list(STAGES), help="stages to rerun even when cached")
+    parser.add_argument("--refresh", action="store_true", help="download a fresh catalog (same as --force load)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--metrics", default=None, help="append timers and counters to this JSON lines file (plus a .prom copy)")
+    parser.add_argument("--memory", action="store_true", help="report the peak of traced Python/NumPy allocations per stage (slower)")
+    args = parser.parse_args()
+
+    force = set(args.force)
+    if args.refresh:
+        force.add("load")
+
+    try:
+        run_pipeline(force=force, workers=args.workers, memory=args.memory)
+    finally:
+        if args.metrics:
+            METRICS.write_jsonl(args.metrics)
+            METRICS.write_prometheus(os.path.splitext(args.metrics)[0] + ".prom")
@@ -0,0 +1,193 @@
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+# On-disk format shared by the pipeline stages and the dashboard.
+# Datasets are stored as Parquet with an explicit schema; the CSV next to
+# each file is optional and only read when the Parquet file is missing.
+
+FLOAT_COLUMNS = [
+    'pl_rade', 'pl_bmasse', 'pl_orbper', 'pl_orbsmax', 'pl_orbeccen', 'pl_eqt',
+    'st_mass', 'st_rad', 'st_teff', 'st_lum', 'sy_dist',
+    'pl_density', 'insolation', 'ESI', 'v_esc', 'Adams_Score', 'AstroBiom_Score', 'cluster_id',
+    'hz_inner_flux', 'hz_outer_flux', 'hz_inner_au', 'hz_outer_au'
+]
+
+# archive uncertainties (upper err1 >= 0, lower err2 <= 0) for the Monte Carlo mode
+ERROR_COLUMNS = [
+    f'{col}err{i}'
+    for col in ['pl_rade', 'pl_bmasse', 'pl_orbper', 'pl_orbsmax', 'pl_eqt', 'st_mass', 'st_rad', 'st_teff', 'st_lum']
+    for i in (1, 2)
+]
+
+LABEL_COLUMNS = [
+    'discoverymethod', 'st_spectype',
+    'habitable_type', 'Bio_Class', 'Atmosphere_Class', 'Adams_Category', 'Planet_Type_ML'
+]
+
+SCHEMA = {
+    'pl_name': 'string',
+    'hostname': 'string',
+    'disc_year': 'Int16',
+    'rowupdate': 'string',
+    'row_hash': 'int64',
+    'code_version': 'string',
+    'n_planets': 'int64',
+    **{col: 'float64' for col in FLOAT_COLUMNS + ERROR_COLUMNS},
+    **{col: 'category' for col in LABEL_COLUMNS},
+}
+
+
+# Columns that stay float64 in the compact in-memory form: the score is
+# used for ranking, where float32 rounding could reorder near-ties.
+EXACT_COLUMNS = ['AstroBiom_Score']
+
+
+def apply_schema(df):
+    df = df.drop(columns=[c for c in df.columns if c.startswith('Unnamed')])
+    dtypes = {col: dtype for col, dtype in SCHEMA.items() if col in df.columns}
+    return df.astype(dtypes)
+
+
+def compact(df):
+    # In-memory form for read-only consumers such as the dashboard: labels as
+    # categories, measurements and derived values as float32. Only the
+    # converted columns are new arrays; the rest is shared with df.
+    dtypes = {col: 'category' for col in LABEL_COLUMNS if col in df.columns}
+    dtypes.update({
+        col: 'float32' for col in FLOAT_COLUMNS + ERROR_COLUMNS
+        if col in df.columns and col not in EXACT_COLUMNS
+    })
+    return df.astype(dtypes)
+
+
+def memory_mb(df):
+    return df.memory_usage(deep=True).sum() / 2**20
+
+
+def csv_path(path):
+    return os.path.splitext(path)[0] + ".csv"
+
+
+def save_dataset(df, path, csv=False):
+    folder = os.path.dirname(path)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+
+    # written under a temporary name and renamed, like DatasetWriter, so a
+    # reader (the dashboard, the next stage) never sees a half-written file
+    df = apply_schema(df)
+    _write_replace(lambda tmp_file: df.to_parquet(tmp_file, index=False), path)
+    if csv:
+        _write_replace(lambda tmp_file: df.to_csv(tmp_file, index=False), csv_path(path))
+
+
+def _write_replace(write, path):
+    tmp_file = path + ".tmp"
+    try:
+        write(tmp_file)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+    os.replace(tmp_file, path)
+
+
+def load_dataset(path, columns=None):
+    # columns that the file does not have are skipped instead of raising
+    if os.path.exists(path):
+        if columns is not None:
+            available = pq.read_schema(path).names
+            columns = [c for c in columns if c in available]
+        return pd.read_parquet(path, columns=columns)
+
+    # older runs only left a CSV behind
+    if os.path.exists(csv_path(path)):
+        usecols = (lambda c: c in columns) if columns is not None else None
+        df = pd.read_csv(csv_path(path), usecols=usecols)
+        return apply_schema(df)
+
+    return None
+
+
+def iter_dataset(path, columns=None, chunk_rows=100_000):
+    # the dataset in chunks of at most chunk_rows rows, schema applied, so
+    # catalogs larger than memory can be streamed
+    if os.path.exists(path):
+        parquet = pq.ParquetFile(path)
+        if columns is not None:
+            columns = [c for c in columns if c in parquet.schema_arrow.names]
+        for batch in parquet.iter_batches(batch_size=chunk_rows, columns=columns):
+            yield apply_schema(batch.to_pandas())
+
+    elif os.path.exists(csv_path(path)):
+        usecols = (lambda c: c in columns) if columns is not None else None
+        for chunk in pd.read_csv(csv_path(path), usecols=usecols, chunksize=chunk_rows):
+            yield apply_schema(chunk)
+
+
+class DatasetWriter:
+    # Builds a dataset chunk by chunk: every write() appends a row group to
+    # one Parquet file (and rows to the CSV copy). The file is written under
+    # a temporary name and only replaces `path` on a clean close.
+
+    def __init__(self, path, csv=False):
+        self.path = path
+        self.csv = csv
+        self.schema = None
+        self.writer = None
+        self.rows = 0
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+
+    def write(self, df):
+        df = apply_schema(df)
+        if self.writer is None:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            # label columns that happen to be empty in the first chunk would
+            # otherwise fix a null dictionary type for the whole file
+            schema = table.schema
+            for col in LABEL_COLUMNS:
+                if col in schema.names:
+                    schema = schema.set(schema.get_field_index(col), pa.field(col, pa.dictionary(pa.int32(), pa.string())))
+            self.schema = schema
+            self.writer = pq.ParquetWriter(self.path + ".tmp", schema)
+            table = table.cast(schema)
+        else:
+            table = pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+        self.writer.write_table(table)
+
+        if self.csv:
+            df.to_csv(csv_path(self.path) + ".tmp", mode="w" if self.rows == 0 else "a", header=self.rows == 0, index=False)
+        self.rows += len(df)
+
+    def close(self):
+        if self.writer is None:
+            return
+        self.writer.close()
+        os.replace(self.path + ".tmp", self.path)
+        if self.csv:
+            os.replace(csv_path(self.path) + ".tmp", csv_path(self.path))
+
+    def abort(self):
+        if self.writer is not None:
+            self.writer.close()
+        for tmp_file in (self.path + ".tmp", csv_path(self.path) + ".tmp"):
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def dataset_exists(path):
+    return os.path.exists(path) or os.path.exists(csv_path(path))
@@ -0,0 +1,109 @@
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import pytest
+
+# the modules are top-level scripts next to app.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeTap:
+    # Stand-in for the archive's TAP sync endpoint: serves `catalog` as CSV,
+    # honours "rowupdate >= 'date'" in the query, Range and If-Range (ETag),
+    # and can fail the next requests with 503 or cut the next body short.
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.etag = '"v1"'
+        self.errors = 0
+        self.cut_after = None
+        self.requests = []
+
+    def body(self, query):
+        df = self.catalog
+        if "rowupdate >= '" in query:
+            since = query.split("rowupdate >= '")[1][:10]
+            df = df[df['rowupdate'] >= since]
+        return df.to_csv(index=False).encode()
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        tap = self.server.tap
+        query = parse_qs(urlparse(self.path).query).get("query", [""])[0]
+        tap.requests.append({"query": query, "headers": dict(self.headers)})
+        if tap.errors:
+            tap.errors -= 1
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = tap.body(query)
+        start, status = 0, 200
+        requested = self.headers.get("Range")
+        if requested and self.headers.get("If-Range") in (None, tap.etag):
+            start = int(requested.split("=")[1].rstrip("-"))
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            status = 206
+
+        payload = body[start:]
+        self.send_response(status)
+        self.send_header("ETag", tap.etag)
+        self.send_header("Content-Length", str(len(payload)))
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+        self.end_headers()
+        if tap.cut_after is not None:
+            # connection drops mid-body
+            self.wfile.write(payload[:tap.cut_after])
+            tap.cut_after = None
+            self.close_connection = True
+            return
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def raw_catalog():
+    # synthetic archive rows plus the awkward hosts: planets without a
+    # hostname and a host with a single planet
+    from benchmark import synthetic_catalog
+
+    df = synthetic_catalog(2000, seed=7)
+    df.loc[df.index[[5, 6, 300, 1200]], 'hostname'] = None
+    single = df.iloc[[10]].assign(pl_name="Lonely b", hostname="Lonely")
+    return pd.concat([df, single], ignore_index=True)
+
+
+@pytest.fixture
+def catalog_csv():
+    return pd.DataFrame({
+        'pl_name': [f"Planet {i}" for i in range(300)],
+        'hostname': [f"Star {i // 2}" for i in range(300)],
+        'pl_rade': [1.0 + i / 100 for i in range(300)],
+        'rowupdate': [f"2024-01-{1 + i % 28:02d}" for i in range(300)],
+    })
+
+
+@pytest.fixture
+def tap_server(catalog_csv):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.tap = FakeTap(catalog_csv)
+    server.tap.url = f"http://127.0.0.1:{server.server_port}/TAP/sync"
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield server.tap
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from catalog import Catalog
+
+TYPES = ["Rocky / Super-Earth", "Ice Giant (Neptunian)", "Gas Giant (Jovian)", "Hot Jupiter / Star"]
+ZONES = ["Too Hot (Hot Zone)", "Too Cold (Cold Zone)", "Habitable Zone (Goldilocks)"]
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(11)
+    n = 3000
+    score = rng.integers(0, 40, n).astype(float)  # many ties
+    score[rng.random(n) < 0.05] = np.nan
+    return pd.DataFrame({
+        'pl_name': [f"{rng.choice(['Kepler', 'TOI', 'K2'])}-{i} b" for i in range(n)],
+        'Planet_Type_ML': rng.choice(TYPES[:3], n),  # no Hot Jupiters: an empty category
+        'habitable_type': rng.choice(ZONES, n),
+        'AstroBiom_Score': score,
+    })
+
+
+def reference(df, mask, k):
+    return df[mask].sort_values('AstroBiom_Score', ascending=False, kind='stable', na_position='last').head(k)
+
+
+@pytest.mark.parametrize("types,zones", [
+    (None, None),
+    (TYPES[:1], None),
+    (None, ZONES[2:]),
+    (TYPES[:2], ZONES[1:]),
+    (TYPES[3:], None),  # nothing selected
+    ([], ZONES),
+])
+def test_select_and_top_k_match_pandas(frame, types, zones):
+    catalog = Catalog(frame)
+    rows = catalog.select(Planet_Type_ML=types, habitable_type=zones)
+
+    mask = pd.Series(True, index=frame.index)
+    if types is not None:
+        mask &= frame['Planet_Type_ML'].isin(types)
+    if zones is not None:
+        mask &= frame['habitable_type'].isin(zones)
+    expected = np.flatnonzero(mask.to_numpy())
+    np.testing.assert_array_equal(np.arange(len(frame)) if rows is None else rows, expected)
+
+    for k in (1, 10, 500, len(frame) + 1):
+        np.testing.assert_array_equal(catalog.top_k(rows, k=k), reference(frame, mask, k).index.to_numpy())
+
+
+def test_search_matches_str_contains(frame):
+    catalog = Catalog(frame)
+    for text in ["toi-1", "K2-", "kepler-299 b", "  99  ", "nothing here"]:
+        mask = frame['pl_name'].str.contains(text.strip(), case=False, regex=False)
+        expected = frame.loc[reference(frame, mask, 20).index, 'pl_name'].tolist()
+        assert catalog.search(text, limit=20) == expected
+    assert catalog.search("") == []
+
+
+def test_search_puts_an_exact_name_first(frame):
+    catalog = Catalog(frame)
+    name = frame['pl_name'].iloc[7]
+    assert catalog.search(name)[0] == name
+    assert catalog.search(name, limit=3)[0] == name
@@ -0,0 +1,81 @@
+import pytest
+
+from data_processor import COMPONENTS, STAR_PARAMETERS, Evaluator, component, process_data, star_summary, star_table
+
+
+def test_one_theory_runs_only_its_components(raw_catalog):
+    df = process_data(raw_catalog, columns=['Atmosphere_Class'])
+    assert 'Atmosphere_Class' in df.columns and 'v_esc' in df.columns
+    for skipped in ['ESI', 'Adams_Score', 'Bio_Class', 'habitable_type', 'AstroBiom_Score']:
+        assert skipped not in df.columns
+
+    ev = Evaluator(df.drop(columns=['Atmosphere_Class', 'v_esc', 'insolation']))
+    assert ev.plan(['Atmosphere_Class']) == ['insolation', 'Atmosphere_Class']
+    ev.compute(['Atmosphere_Class'])
+    assert ev.done == {'insolation', 'Atmosphere_Class'}
+
+
+def test_plan_puts_dependencies_first_and_runs_each_once(raw_catalog):
+    order = Evaluator(raw_catalog).plan(['AstroBiom_Score', 'ESI', 'habitable_type'])
+    assert len(order) == len(set(order))
+    for before, after in [('density', 'ESI'), ('temperature', 'ESI'), ('ESI', 'AstroBiom_Score'),
+                          ('Adams', 'AstroBiom_Score'), ('insolation', 'habitable_type'),
+                          ('habitable_zone', 'habitable_type')]:
+        assert order.index(before) < order.index(after)
+    assert set(order) <= set(COMPONENTS)
+
+
+def test_partial_columns_match_the_full_run(raw_catalog):
+    full = process_data(raw_catalog)
+    part = process_data(raw_catalog, columns=['Adams_Category', 'habitable_type'])
+    for col in ['Adams_Category', 'Adams_Score', 'habitable_type', 'insolation', 'pl_eqt']:
+        assert part[col].equals(full[col])
+
+
+def test_dependency_cycle_raises():
+    components = {}
+
+    def register(name, inputs, outputs):
+        def compute(ev):
+            return {col: ev['x'] for col in outputs}
+        components[name] = {"inputs": inputs, "outputs": outputs, "compute": compute}
+
+    register("a", ['c'], ['a'])
+    register("b", ['a'], ['b'])
+    register("c", ['b'], ['c'])
+    with pytest.raises(ValueError, match="Circular"):
+        Evaluator({'x': [1]}, components=components).plan(['b'])
+
+
+def test_unknown_column_raises(raw_catalog):
+    with pytest.raises(KeyError):
+        Evaluator(raw_catalog).plan(['Not_A_Score'])
+
+
+def test_new_component_is_not_run_unless_asked(raw_catalog, monkeypatch):
+    calls = []
+    monkeypatch.setitem(COMPONENTS, "gravity", None)
+
+    @component("gravity", inputs=['pl_bmasse', 'pl_rade'], outputs=['surface_gravity'])
+    def _gravity(ev):
+        calls.append(1)
+        return {'surface_gravity': ev['pl_bmasse'] / ev['pl_rade'] ** 2}
+
+    process_data(raw_catalog, columns=['ESI'])
+    assert calls == []
+    df = process_data(raw_catalog, columns=['surface_gravity'])
+    assert calls == [1] and 'surface_gravity' in df.columns
+
+
+def test_planets_without_a_hostname_are_their_own_star(raw_catalog):
+    # same stellar parameters, so only the missing hostname tells them apart
+    df = raw_catalog.copy()
+    orphan = df['hostname'].isna()
+    df.loc[orphan, STAR_PARAMETERS] = df.loc[orphan, STAR_PARAMETERS].iloc[0].to_numpy()
+    stars, star_of = star_table(df)
+    summary = star_summary(stars, star_of)
+
+    orphans = star_of[orphan.to_numpy()]
+    assert len(set(orphans)) == 4
+    assert (summary['n_planets'].to_numpy()[orphans] == 1).all()
+    assert summary['n_planets'].sum() == len(raw_catalog)
@@ -0,0 +1,92 @@
+import datetime
+import json
+
+import pandas as pd
+import pytest
+
+import data_load
+from fetch import build_query
+from storage import load_dataset
+
+
+@pytest.fixture
+def files(tmp_path, monkeypatch):
+    for name, file in [("RAW_FILE", "raw.parquet"), ("DOWNLOAD_FILE", "download.csv"),
+                       ("DELTA_FILE", "delta.csv"), ("STATE_FILE", "state.json")]:
+        monkeypatch.setattr(data_load, name, str(tmp_path / file))
+    return tmp_path
+
+
+def update_catalog(tap):
+    # two planets revised and one discovered after the first download
+    df = tap.catalog.copy()
+    df.loc[[3, 10], 'pl_rade'] = [9.5, 9.75]
+    df.loc[[3, 10], 'rowupdate'] = "2024-02-01"
+    new = pd.DataFrame({'pl_name': ["Planet new"], 'hostname': ["Star new"],
+                        'pl_rade': [2.0], 'rowupdate': ["2024-02-02"]})
+    tap.catalog = pd.concat([df, new], ignore_index=True)
+
+
+def test_full_download_sets_the_watermark(files, tap_server, catalog_csv):
+    df = data_load.get_data(url=tap_server.url)
+    assert len(df) == len(catalog_csv)
+    state = data_load.load_state()
+    assert state == {"watermark": "2024-01-28", "last_full": datetime.date.today().isoformat()}
+
+
+def test_sync_fetches_only_rows_updated_since_the_watermark(files, tap_server):
+    data_load.get_data(url=tap_server.url)
+    update_catalog(tap_server)
+
+    df = data_load.sync_data(url=tap_server.url)
+
+    assert "rowupdate >= '2024-01-28'" in tap_server.requests[-1]["query"]
+    expected = tap_server.catalog.sort_values('pl_name').reset_index(drop=True)
+    for frame in (df, load_dataset(data_load.RAW_FILE)):
+        merged = frame.sort_values('pl_name').reset_index(drop=True)
+        pd.testing.assert_frame_equal(merged, expected, check_dtype=False)
+    assert data_load.load_state()["watermark"] == "2024-02-02"
+
+
+def test_merge_delta_replaces_rows_by_name():
+    local = pd.DataFrame({'pl_name': ["a", "b", "c"], 'pl_rade': [1.0, 2.0, 3.0]})
+    delta = pd.DataFrame({'pl_name': ["b", "d", "b"], 'pl_rade': [20.0, 4.0, 21.0]})
+    merged = data_load.merge_delta(local, delta)
+    assert merged.set_index('pl_name')['pl_rade'].to_dict() == {"a": 1.0, "c": 3.0, "d": 4.0, "b": 21.0}
+
+
+def test_stale_full_refresh_downloads_everything(files, tap_server):
+    data_load.get_data(url=tap_server.url)
+    state = data_load.load_state()
+    state["last_full"] = (datetime.date.today() - datetime.timedelta(days=data_load.FULL_REFRESH_DAYS)).isoformat()
+    data_load.save_state(state)
+
+    data_load.sync_data(url=tap_server.url)
+    assert "rowupdate >=" not in tap_server.requests[-1]["query"]
+
+
+def test_delta_part_of_an_older_watermark_is_discarded(files, tap_server):
+    data_load.get_data(url=tap_server.url)
+    update_catalog(tap_server)
+
+    # an interrupted sync from an earlier watermark left its partial delta
+    old_query = build_query(since="2024-01-05")
+    part = files / "delta.csv.part"
+    part.write_bytes(tap_server.body(old_query)[:500])
+    meta = {"url": tap_server.url, "params": {"query": old_query, "format": "csv"}, "etag": tap_server.etag}
+    (files / "delta.csv.part.json").write_text(json.dumps(meta))
+
+    df = data_load.sync_data(url=tap_server.url)
+
+    assert "Range" not in tap_server.requests[-1]["headers"]
+    assert len(df) == len(tap_server.catalog)
+    assert not part.exists()
+
+
+def test_unparsable_delta_is_reported_and_dropped(files, tap_server, capsys):
+    data_load.get_data(url=tap_server.url)
+    tap_server.body = lambda query: b"a,b\n1,2\n3,4,5,6\n"
+
+    assert data_load.sync_data(url=tap_server.url) is None
+    assert "Could not parse the download" in capsys.readouterr().out
+    assert not (files / "delta.csv.part").exists()
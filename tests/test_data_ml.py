@@ -0,0 +1,93 @@
+import pandas as pd
+import pytest
+
+import data_ml
+import data_processor
+from benchmark import synthetic_catalog
+from storage import load_dataset, save_dataset
+
+
+@pytest.fixture
+def files(tmp_path, monkeypatch):
+    # processed catalog in place, clustering outputs in tmp_path
+    processed = str(tmp_path / "processed.parquet")
+    monkeypatch.setattr(data_processor, "RAW_FILE", str(tmp_path / "raw.parquet"))
+    monkeypatch.setattr(data_processor, "PROCESSED_FILE", processed)
+    monkeypatch.setattr(data_processor, "MANIFEST_FILE", str(tmp_path / "manifest.parquet"))
+    monkeypatch.setattr(data_processor, "STARS_FILE", str(tmp_path / "stars.parquet"))
+    monkeypatch.setattr(data_ml, "INPUT_FILE", processed)
+    monkeypatch.setattr(data_ml, "OUTPUT_FILE", str(tmp_path / "final.parquet"))
+    monkeypatch.setattr(data_ml, "MODEL_FILE", str(tmp_path / "model.json"))
+    monkeypatch.setattr(data_ml, "NEIGHBORS_FILE", str(tmp_path / "neighbors.pkl"))
+    save_dataset(synthetic_catalog(3000, seed=5), data_processor.RAW_FILE)
+    data_processor.run()
+    return tmp_path
+
+
+def test_incremental_skips_an_unchanged_catalog(files):
+    data_ml.run()
+    assert data_ml.run(incremental=True) is None
+
+
+def test_incremental_reclusters_when_processed_columns_change(files):
+    data_ml.run()
+
+    # new processing code: same raw rows (same row_hash), other scores
+    processed = load_dataset(data_processor.PROCESSED_FILE)
+    processed['ESI'] = processed['ESI'] / 2
+    save_dataset(processed, data_processor.PROCESSED_FILE)
+
+    df_final = data_ml.run(incremental=True)
+    assert df_final is not None
+    pd.testing.assert_series_equal(
+        load_dataset(data_ml.OUTPUT_FILE)['ESI'], processed['ESI'], check_dtype=False
+    )
+
+
+def test_chunked_assignment_equals_in_memory(files):
+    data_ml.run()
+    # force a reassignment with the saved model in both modes
+    processed = load_dataset(data_processor.PROCESSED_FILE)
+    processed['ESI'] = processed['ESI'] / 2
+    save_dataset(processed, data_processor.PROCESSED_FILE)
+
+    data_ml.run(incremental=True)
+    in_memory = load_dataset(data_ml.OUTPUT_FILE)
+    data_ml.run(incremental=True, chunk_rows=700)
+    chunked = load_dataset(data_ml.OUTPUT_FILE)
+
+    pd.testing.assert_frame_equal(chunked, in_memory)
+
+
+def test_chunked_fit_assigns_every_planet(files):
+    data_ml.run(chunk_rows=700)
+    df_final = load_dataset(data_ml.OUTPUT_FILE)
+    complete = df_final[data_ml.FEATURES].notna().all(axis=1)
+    assert df_final.loc[complete, 'Planet_Type_ML'].notna().all()
+    assert data_ml.load_model(data_ml.MODEL_FILE)['version'] == 1
+
+
+def test_chunked_processing_equals_in_memory(files):
+    in_memory = load_dataset(data_processor.PROCESSED_FILE)
+    data_processor.run(chunk_rows=700)
+    chunked = load_dataset(data_processor.PROCESSED_FILE)
+    pd.testing.assert_frame_equal(chunked, in_memory)
+
+
+def test_chunked_processing_rejects_incremental(files):
+    with pytest.raises(ValueError):
+        data_processor.run(incremental=True, chunk_rows=700)
+
+
+def test_version_goes_up_when_the_previous_model_cannot_seed_the_fit(files):
+    data_ml.run()
+    previous = data_ml.load_model(data_ml.MODEL_FILE)
+    other = dict(previous, n_clusters=previous['n_clusters'] + 1, version=7)
+    df = load_dataset(data_processor.PROCESSED_FILE)
+
+    assert data_ml.fit_model(df[data_ml.FEATURES].dropna(), previous=other)['version'] == 8
+
+    def read_features():
+        return iter([df[data_ml.FEATURES]])
+
+    assert data_ml.fit_model_streaming(read_features, previous=other, epochs=1)['version'] == 8
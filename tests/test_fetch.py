@@ -0,0 +1,80 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from fetch import QUERY, fetch_catalog
+
+
+def fetch(tap, dest, query=QUERY):
+    # small chunks, so a cut body still delivers whole chunks before the error
+    return fetch_catalog(str(dest), query=query, url=tap.url, backoff=0, chunk_size=100)
+
+
+def test_download_is_parsed_and_saved(tap_server, catalog_csv, tmp_path):
+    df = fetch(tap_server, tmp_path / "raw.csv")
+    pd.testing.assert_frame_equal(df, catalog_csv)
+    assert os.path.exists(tmp_path / "raw.csv")
+    assert not os.path.exists(tmp_path / "raw.csv.part")
+    assert not os.path.exists(tmp_path / "raw.csv.part.json")
+
+
+def test_server_errors_are_retried(tap_server, catalog_csv, tmp_path):
+    tap_server.errors = 2
+    pd.testing.assert_frame_equal(fetch(tap_server, tmp_path / "raw.csv"), catalog_csv)
+    assert len(tap_server.requests) == 3
+
+
+def test_cut_body_resumes_with_range_and_if_range(tap_server, catalog_csv, tmp_path):
+    tap_server.cut_after = 1000
+    pd.testing.assert_frame_equal(fetch(tap_server, tmp_path / "raw.csv"), catalog_csv)
+    resume = tap_server.requests[-1]["headers"]
+    assert resume["Range"] == "bytes=1000-"
+    assert resume["If-Range"] == tap_server.etag
+
+
+def test_part_file_of_the_same_query_is_resumed(tap_server, catalog_csv, tmp_path):
+    dest = tmp_path / "raw.csv"
+    body = tap_server.body(QUERY)
+    (tmp_path / "raw.csv.part").write_bytes(body[:500])
+    meta = {"url": tap_server.url, "params": {"query": QUERY, "format": "csv"}, "etag": tap_server.etag, "last_modified": None}
+    (tmp_path / "raw.csv.part.json").write_text(json.dumps(meta))
+
+    pd.testing.assert_frame_equal(fetch(tap_server, dest), catalog_csv)
+    assert [r["headers"].get("Range") for r in tap_server.requests] == ["bytes=500-"]
+
+
+def test_part_file_without_sidecar_is_discarded(tap_server, catalog_csv, tmp_path):
+    (tmp_path / "raw.csv.part").write_bytes(b"pl_name,other\nstale,1\n")
+    pd.testing.assert_frame_equal(fetch(tap_server, tmp_path / "raw.csv"), catalog_csv)
+    assert "Range" not in tap_server.requests[0]["headers"]
+
+
+def test_part_file_of_another_query_is_discarded(tap_server, catalog_csv, tmp_path):
+    body = tap_server.body(QUERY)
+    (tmp_path / "raw.csv.part").write_bytes(body[:500])
+    meta = {"url": tap_server.url, "params": {"query": "SELECT 1", "format": "csv"}, "etag": tap_server.etag}
+    (tmp_path / "raw.csv.part.json").write_text(json.dumps(meta))
+
+    pd.testing.assert_frame_equal(fetch(tap_server, tmp_path / "raw.csv"), catalog_csv)
+    assert "Range" not in tap_server.requests[0]["headers"]
+
+
+def test_changed_content_restarts_instead_of_joining(tap_server, catalog_csv, tmp_path):
+    # the .part holds the start of an older version of the result
+    old = catalog_csv.assign(pl_rade=0.5)
+    (tmp_path / "raw.csv.part").write_bytes(old.to_csv(index=False).encode()[:2000])
+    meta = {"url": tap_server.url, "params": {"query": QUERY, "format": "csv"}, "etag": '"v0"'}
+    (tmp_path / "raw.csv.part.json").write_text(json.dumps(meta))
+
+    pd.testing.assert_frame_equal(fetch(tap_server, tmp_path / "raw.csv"), catalog_csv)
+    assert tap_server.requests[0]["headers"]["If-Range"] == '"v0"'
+
+
+def test_unparsable_download_is_not_resumed(tap_server, tmp_path):
+    tap_server.body = lambda query: b"a,b\n1,2\n3,4,5,6\n"
+    with pytest.raises(pd.errors.ParserError):
+        fetch(tap_server, tmp_path / "raw.csv")
+    assert not os.path.exists(tmp_path / "raw.csv.part")
+    assert not os.path.exists(tmp_path / "raw.csv.part.json")
@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+
+import data_processor
+from benchmark import synthetic_catalog
+from storage import load_dataset, save_dataset
+
+
+@pytest.fixture
+def files(tmp_path, monkeypatch):
+    for name in ("RAW_FILE", "PROCESSED_FILE", "MANIFEST_FILE", "STARS_FILE"):
+        monkeypatch.setattr(data_processor, name, str(tmp_path / f"{name.lower()}.parquet"))
+    df_raw = synthetic_catalog(3000, seed=4)
+    save_dataset(df_raw, data_processor.RAW_FILE)
+    return df_raw
+
+
+def test_incremental_matches_full_rebuild(files):
+    full = data_processor.run()
+    df_raw = files.copy()
+    df_raw.loc[df_raw.index[:50], 'pl_orbper'] *= 2
+    save_dataset(df_raw.iloc[100:], data_processor.RAW_FILE)
+
+    incremental = data_processor.run(incremental=True)
+    rebuilt = data_processor.run()
+    assert len(incremental) < len(full)
+    # saved results carry no index
+    pd.testing.assert_frame_equal(
+        incremental.reset_index(drop=True), rebuilt.reset_index(drop=True), check_dtype=False, check_categorical=False
+    )
+
+
+def test_results_from_other_code_are_rebuilt(files):
+    data_processor.run()
+    manifest = load_dataset(data_processor.MANIFEST_FILE)
+    manifest['code_version'] = "older"
+    save_dataset(manifest, data_processor.MANIFEST_FILE)
+    stale = load_dataset(data_processor.PROCESSED_FILE)
+    stale['ESI'] = -1.0
+    save_dataset(stale, data_processor.PROCESSED_FILE)
+
+    result = data_processor.run(incremental=True)
+    assert (result['ESI'] >= 0).all()
+    assert (load_dataset(data_processor.MANIFEST_FILE)['code_version'] == data_processor.code_version()).all()
+
+
+def test_results_missing_an_output_column_are_rebuilt(files):
+    data_processor.run()
+    stale = load_dataset(data_processor.PROCESSED_FILE).drop(columns=['hz_inner_flux', 'hz_outer_flux'])
+    save_dataset(stale, data_processor.PROCESSED_FILE)
+
+    result = data_processor.run(incremental=True)
+    assert result['hz_inner_flux'].notna().all()
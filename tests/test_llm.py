@@ -0,0 +1,199 @@
+import asyncio
+import time
+
+import pandas as pd
+import pytest
+
+from llm import ResponseCache, pregenerate_profiles, profile_key, stream_profile, stream_text
+from metrics import METRICS
+from storage import compact
+
+
+class FakeStream:
+    # iterator over response chunks, like the SDK's streamed response
+
+    def __init__(self, texts, delay=0.0):
+        self.texts = list(texts)
+        self.delay = delay
+        self.sent = 0
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.sent == len(self.texts):
+            raise StopIteration
+        time.sleep(self.delay)
+        self.sent += 1
+        return type("Chunk", (), {"text": self.texts[self.sent - 1]})()
+
+    def close(self):
+        self.closed = True
+
+
+class FakeModel:
+
+    def __init__(self, texts, delay=0.0):
+        self.texts = texts
+        self.delay = delay
+        self.calls = []
+        self.stream = None
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        self.calls.append({"prompt": prompt, "stream": stream, "request_options": request_options})
+        self.stream = FakeStream(self.texts, self.delay)
+        return self.stream
+
+
+def counter(name, **labels):
+    return METRICS.counters.get((name, tuple(sorted(labels.items()))), 0)
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    METRICS.reset()
+    yield
+    METRICS.reset()
+
+
+@pytest.fixture
+def planet():
+    return pd.Series({'pl_name': "Kepler-442 b", 'pl_rade': 1.34, 'ESI': 0.84, 'AstroBiom_Score': 71.2})
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(str(tmp_path / "cache.sqlite"), max_entries=10)
+
+
+def test_chunks_come_in_order():
+    model = FakeModel(["Habitable", "", " maybe", "."])
+    assert list(stream_text(model, "prompt", timeout=5)) == ["Habitable", " maybe", "."]
+    assert model.calls[0]["stream"] is True
+    assert model.calls[0]["request_options"] == {"timeout": 5}
+    assert model.stream.closed
+
+
+def test_slow_stream_times_out(planet, cache):
+    model = FakeModel(["a", "b", "c", "d"], delay=0.05)
+    with pytest.raises(TimeoutError):
+        list(stream_profile(model, planet['pl_name'], planet, cache=cache, timeout=0.08))
+    assert model.stream.closed
+    assert counter("llm.stream_timeouts") == 1
+    assert len(cache) == 0
+
+
+def test_closed_stream_stops_reading_and_is_not_cached(planet, cache):
+    model = FakeModel(["a", "b", "c", "d"])
+    stream = stream_profile(model, planet['pl_name'], planet, cache=cache)
+    assert next(stream) == "a"
+    stream.close()
+
+    assert model.stream.closed
+    assert model.stream.sent == 1
+    assert counter("llm.stream_cancelled") == 1
+    assert len(cache) == 0
+
+
+def test_complete_stream_is_cached_and_served_whole(planet, cache):
+    model = FakeModel(["Rocky", " and", " temperate"])
+    assert list(stream_profile(model, planet['pl_name'], planet, cache=cache)) == ["Rocky", " and", " temperate"]
+    assert cache.get(profile_key(planet)) == "Rocky and temperate"
+
+    assert list(stream_profile(model, planet['pl_name'], planet, cache=cache)) == ["Rocky and temperate"]
+    assert len(model.calls) == 1
+    assert counter("llm.cache", result="hit") == 1
+    assert counter("llm.cache", result="miss") == 1
+
+
+class FakeAsyncModel:
+    # records how many requests are in flight at once
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.in_flight = 0
+        self.peak = 0
+        self.prompts = []
+
+    async def generate_content_async(self, prompt):
+        self.prompts.append(prompt)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            if any(name in prompt for name in self.fail):
+                raise RuntimeError("quota exceeded")
+            return type("Response", (), {"text": prompt.split("exoplanet ")[1].split(".")[0]})()
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.fixture
+def candidates():
+    return pd.DataFrame({
+        'pl_name': [f"Planet {i}" for i in range(12)],
+        'ESI': [0.5] * 12,
+        'AstroBiom_Score': [float(i) for i in range(12)],
+    })
+
+
+def test_profile_key_of_compacted_rows_with_nan():
+    # the dashboard and the batch job key on compact() rows: float32 and
+    # categories, with NaN where the archive has no value
+    df = compact(pd.DataFrame({
+        'pl_name': ["a", "b"],
+        'pl_eqt': [float("nan"), 255.0],
+        'ESI': [0.8, float("nan")],
+        'AstroBiom_Score': [70.5, 12.0],
+        'Planet_Type_ML': ["Rocky", None],
+    }))
+    assert df['ESI'].dtype == 'float32'
+
+    keys = [profile_key(row) for _, row in df.iterrows()]
+    assert len(set(keys)) == 2
+    assert keys[0] == profile_key(compact(df).iloc[0])
+    changed = df.iloc[0].copy()
+    changed['AstroBiom_Score'] = 71.0
+    assert keys[0] != profile_key(changed)
+
+
+def test_pregenerate_caps_requests_in_flight(candidates, cache):
+    model = FakeAsyncModel()
+    counts = asyncio.run(pregenerate_profiles(candidates, model, cache, top_n=10, concurrency=3))
+
+    assert counts == {"cached": 0, "generated": 10, "failed": 0}
+    assert model.peak == 3
+    # only the top 10 by score
+    assert not any("Planet 0." in p or "Planet 1." in p for p in model.prompts)
+    assert cache.get(profile_key(candidates.iloc[11])) == "Planet 11"
+
+
+def test_pregenerate_skips_cached_and_keeps_going_after_failures(candidates, cache):
+    asyncio.run(pregenerate_profiles(candidates, FakeAsyncModel(), cache, top_n=4))
+
+    model = FakeAsyncModel(fail=["Planet 6."])
+    counts = asyncio.run(pregenerate_profiles(candidates, model, cache, top_n=8, concurrency=2))
+
+    assert counts == {"cached": 4, "generated": 3, "failed": 1}
+    assert len(model.prompts) == 4
+    assert cache.get(profile_key(candidates.iloc[6])) is None
+    assert len(cache) == 7
+
+
+def test_pregenerate_with_nan_scores(candidates, cache):
+    df = compact(candidates.assign(ESI=[float("nan")] * 12))
+    counts = asyncio.run(pregenerate_profiles(df, FakeAsyncModel(), cache, top_n=5))
+    assert counts == {"cached": 0, "generated": 5, "failed": 0}
+
+
+def test_response_cache_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+    cache.put("a", "1")
+    time.sleep(0.01)
+    cache.put("b", "2")
+    time.sleep(0.01)
+    cache.get("a")
+    time.sleep(0.01)
+    cache.put("c", "3")
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == ("1", None, "3")
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from neighbors import NeighborIndex
+
+FEATURES = ['pl_bmasse', 'pl_rade', 'pl_density', 'pl_eqt']
+
+
+@pytest.fixture
+def planets():
+    rng = np.random.default_rng(3)
+    n = 2000
+    df = pd.DataFrame({name: rng.lognormal(0, 1, n) for name in FEATURES})
+    df.loc[rng.random(n) < 0.05, 'pl_eqt'] = np.nan
+    df['pl_name'] = [f"P{i}" for i in range(n)]
+    # a rare label, so a filtered query has to widen its search several times
+    df['habitable_type'] = np.where(rng.random(n) < 0.01, "Habitable Zone (Goldilocks)", "Too Hot (Hot Zone)")
+    df['Planet_Type_ML'] = rng.choice(["Rocky", "Gas"], n)
+    return df
+
+
+@pytest.fixture
+def index(planets):
+    X = planets[FEATURES].dropna()
+    model = {'features': FEATURES, 'version': 1, 'mean': X.mean().tolist(), 'scale': X.std(ddof=0).tolist()}
+    return NeighborIndex(planets, model)
+
+
+def brute_force(planets, index, name, **filters):
+    df = planets.dropna(subset=FEATURES)
+    X = (df[FEATURES].to_numpy() - index.mean) / index.scale
+    target = X[df['pl_name'].to_numpy() == name][0]
+    distances = np.sqrt(((X - target) ** 2).sum(axis=1))
+    keep = df['pl_name'].to_numpy() != name
+    for col, values in filters.items():
+        if values:
+            keep &= df[col].isin(values).to_numpy()
+    order = np.argsort(distances[keep], kind='stable')
+    return df['pl_name'].to_numpy()[keep][order], distances[keep][order]
+
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {'habitable_type': ["Habitable Zone (Goldilocks)"]},
+    {'habitable_type': ["Habitable Zone (Goldilocks)"], 'Planet_Type_ML': ["Rocky"]},
+    {'Planet_Type_ML': ["Gas"]},
+])
+def test_nearest_matches_brute_force(planets, index, filters):
+    for name in ["P0", "P17", "P1500"]:
+        if name not in index.positions:
+            continue
+        names, distances = brute_force(planets, index, name, **filters)
+        for k in (1, 5, 30):
+            result = index.nearest(name, k=k, **filters)
+            assert [r['pl_name'] for r in result] == list(names[:k])
+            np.testing.assert_allclose([r['distance'] for r in result], distances[:k])
+
+
+def test_nearest_returns_all_matches_when_fewer_than_k(planets, index):
+    rare = {'habitable_type': ["Habitable Zone (Goldilocks)"]}
+    names, _ = brute_force(planets, index, "P0", **rare)
+    assert len(index.nearest("P0", k=500, **rare)) == len(names) < 500
+
+
+@pytest.mark.parametrize("radius", [0.0, 0.3, 1.0])
+def test_within_matches_brute_force(planets, index, radius):
+    for filters in ({}, {'Planet_Type_ML': ["Rocky"]}):
+        names, distances = brute_force(planets, index, "P17", **filters)
+        result = index.within("P17", radius, **filters)
+        assert [r['pl_name'] for r in result] == list(names[distances <= radius])
+        np.testing.assert_allclose([r['distance'] for r in result], distances[distances <= radius])
@@ -0,0 +1,93 @@
+import math
+import os
+from collections import Counter
+
+import pytest
+
+import papers
+from papers import PaperIndex, tokenize, update_index
+
+DOCS = [
+    {"source": "kopparapu.pdf", "page": 1, "text": "The habitable zone around main sequence stars: new estimates of the habitable zone edges."},
+    {"source": "zahnle.pdf", "page": 3, "text": "The cosmic shoreline: escape velocity against insolation decides which planets keep an atmosphere."},
+    {"source": "adams.pdf", "page": 2, "text": "Rotation rate and climate of planets in the habitable zone of red dwarf stars."},
+]
+
+
+def bm25(chunks, query, k1=1.5, b=0.75):
+    # textbook BM25, one chunk at a time
+    docs = [Counter(tokenize(c["text"])) for c in chunks]
+    avg = sum(sum(d.values()) for d in docs) / len(docs)
+    scores = []
+    for d in docs:
+        score = 0.0
+        for term in set(tokenize(query)):
+            df = sum(term in other for other in docs)
+            if not d[term]:
+                continue
+            idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+            score += idf * d[term] * (k1 + 1) / (d[term] + k1 * (1 - b + b * sum(d.values()) / avg))
+        scores.append(score)
+    return scores
+
+
+def test_search_ranks_like_bm25():
+    index = PaperIndex(DOCS)
+    for query in ["habitable zone", "escape velocity atmosphere", "red dwarf habitable planets"]:
+        expected = bm25(DOCS, query)
+        results = index.search(query, k=3)
+        assert [r["score"] for r in results] == pytest.approx(sorted((s for s in expected if s), reverse=True))
+        assert results[0]["source"] == DOCS[max(range(3), key=expected.__getitem__)]["source"]
+
+
+def test_search_top_k_and_no_match():
+    index = PaperIndex(DOCS)
+    assert index.search("habitable zone", k=3)[0]["source"] == "kopparapu.pdf"
+    assert len(index.search("habitable zone planets", k=1)) == 1
+    assert index.search("quasar spectroscopy") == []
+    assert PaperIndex([]).search("habitable") == []
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    # "PDFs" are text files with pages separated by form feeds; every
+    # extract_all call is recorded
+    papers_dir = tmp_path / "papers"
+    papers_dir.mkdir()
+    monkeypatch.setattr(papers, "extract_pages", lambda path: open(path).read().split("\f"))
+
+    calls = []
+    extract_all = papers.extract_all
+
+    def spy(paths, cache_dir=None, workers=None):
+        calls.append(sorted(os.path.basename(p) for p in paths))
+        return extract_all(paths, cache_dir=str(tmp_path / "text"), workers=workers)
+
+    monkeypatch.setattr(papers, "extract_all", spy)
+    index_file = str(tmp_path / "index.json")
+    return papers_dir, calls, lambda: update_index(str(papers_dir), index_file)
+
+
+def test_update_index_extracts_only_changed_files(library):
+    papers_dir, calls, update = library
+
+    (papers_dir / "a.pdf").write_text("habitable zone edges\fsecond page on stars")
+    assert len(update()) == 2
+    (papers_dir / "b.pdf").write_text("cosmic shoreline escape velocity")
+    index = update()
+    assert calls[-1] == ["b.pdf"]
+    assert index.search("shoreline")[0]["source"] == "b.pdf"
+
+    update()
+    assert calls[-1] == []
+
+    (papers_dir / "a.pdf").write_text("tidal locking of planets")
+    index = update()
+    assert calls[-1] == ["a.pdf"]
+    assert index.search("habitable") == []
+    assert index.search("tidal")[0]["source"] == "a.pdf"
+
+    (papers_dir / "b.pdf").unlink()
+    index = update()
+    assert calls[-1] == []
+    assert {c["source"] for c in index.chunks} == {"a.pdf"}
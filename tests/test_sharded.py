@@ -0,0 +1,19 @@
+import pandas as pd
+
+from data_processor import process_data, process_sharded
+
+
+def test_sharded_output_equals_serial(raw_catalog):
+    assert raw_catalog['hostname'].isna().sum() == 4
+    assert (raw_catalog['hostname'] == "Lonely").sum() == 1
+
+    serial = process_data(raw_catalog)
+    sharded = process_sharded(raw_catalog, workers=2, shards_per_worker=3)
+    pd.testing.assert_frame_equal(sharded, serial)
+
+
+def test_sharded_output_equals_serial_for_some_columns(raw_catalog):
+    columns = ['Atmosphere_Class', 'habitable_type']
+    pd.testing.assert_frame_equal(
+        process_sharded(raw_catalog, workers=2, columns=columns), process_data(raw_catalog, columns)
+    )
@@ -0,0 +1,25 @@
+import os
+
+import pandas as pd
+import pytest
+
+from storage import load_dataset, save_dataset
+
+
+def test_failed_save_leaves_the_previous_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "final.parquet")
+    old = pd.DataFrame({'pl_name': ["a", "b"], 'pl_rade': [1.0, 2.0]})
+    save_dataset(old, path, csv=True)
+
+    def broken(self, target, **kwargs):
+        with open(target, "wb") as f:
+            f.write(b"PAR1 half")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(pd.DataFrame, "to_parquet", broken)
+    with pytest.raises(OSError):
+        save_dataset(old.assign(pl_rade=[3.0, 4.0]), path)
+    monkeypatch.undo()
+
+    assert load_dataset(path)['pl_rade'].tolist() == [1.0, 2.0]
+    assert sorted(os.listdir(tmp_path)) == ["final.csv", "final.parquet"]
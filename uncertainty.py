@@ -0,0 +1,170 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from data_processor import (
+    RAW_FILE, luminosity, semi_major_axis, mass_from_radius, density, insolation, equilibrium_temperature,
+    hz_flux_limits,
+    esi, escape_velocity, adams_score,
+    habitability_codes, bio_codes, atmosphere_codes, adams_codes,
+    HABITABILITY_LABELS, BIO_LABELS, ATMOSPHERE_LABELS, ADAMS_LABELS,
+)
+from storage import load_dataset, save_dataset, dataset_exists
+
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+UNCERTAINTY_FILE = os.path.join(current_dir, "data", "astrobiom_uncertainty.parquet")
+
+# Monte Carlo mode of data_processor: every planet gets `samples` draws of
+# its measured parameters from the archive error bars, pushed through the
+# same kernels as process_data on (planets x samples) arrays. Planets are
+# processed in chunks of about CHUNK_ELEMENTS values per array, in a
+# process pool; each chunk has its own seed, so the result does not depend
+# on the number of workers.
+
+PARAMETERS = ['pl_rade', 'pl_bmasse', 'pl_orbper', 'pl_orbsmax', 'pl_eqt', 'st_mass', 'st_rad', 'st_teff', 'st_lum']
+# st_lum is log10, everything else must stay positive
+POSITIVE = [p for p in PARAMETERS if p != 'st_lum']
+
+SCORES = ['ESI', 'insolation', 'v_esc', 'Adams_Score', 'AstroBiom_Score']
+PERCENTILES = [5, 50, 95]
+CLASSES = {
+    'habitable_type': HABITABILITY_LABELS,
+    'Bio_Class': BIO_LABELS,
+    'Atmosphere_Class': ATMOSPHERE_LABELS,
+    'Adams_Category': ADAMS_LABELS,
+}
+
+CHUNK_ELEMENTS = 1_000_000
+
+
+def kept_rows(df):
+    # the rows process_data keeps after value recovery
+    has = {col: df[col].notna().to_numpy() for col in PARAMETERS}
+    return (
+        (has['st_lum'] | (has['st_rad'] & has['st_teff']))
+        & (has['pl_orbsmax'] | (has['pl_orbper'] & has['st_mass']))
+        & (has['pl_bmasse'] | has['pl_rade'])
+        & has['pl_rade'] & has['st_teff']
+    )
+
+
+def draw(rng, value, err1, err2, samples, positive):
+    # split normal: err1 above the value, |err2| below; missing errors = exact value
+    z = rng.standard_normal((len(value), samples))
+    sigma = np.where(z > 0, np.nan_to_num(err1)[:, None], np.abs(np.nan_to_num(err2))[:, None])
+    x = value[:, None] + z * sigma
+    if positive:
+        # wide lower error bars would reach zero or below
+        x = np.maximum(x, 1e-3 * value[:, None])
+    return x
+
+
+def simulate(inputs, samples, rng):
+    # inputs: {col: value array, col+'err1': ..., col+'err2': ...}; NaN value = not measured.
+    # Returns {score: (planets, samples)} and {class column: code array of the same shape}.
+    p = {
+        col: draw(rng, inputs[col], inputs[col + 'err1'], inputs[col + 'err2'], samples, col in POSITIVE)
+        for col in PARAMETERS
+    }
+
+    # 1 data recovery, per sample
+    st_lum = np.where(np.isnan(p['st_lum']), luminosity(p['st_rad'], p['st_teff']), p['st_lum'])
+    orbsmax = np.where(np.isnan(p['pl_orbsmax']), semi_major_axis(p['pl_orbper'], p['st_mass']), p['pl_orbsmax'])
+    mass = np.where(np.isnan(p['pl_bmasse']), mass_from_radius(p['pl_rade']), p['pl_bmasse'])
+
+    # 2 Physics
+    flux = insolation(st_lum, orbsmax)
+    inner, outer = hz_flux_limits(p['st_teff'])
+    temp = np.where(np.isnan(p['pl_eqt']), equilibrium_temperature(p['st_teff'], p['st_rad'], orbsmax), p['pl_eqt'])
+    v_esc = escape_velocity(mass, p['pl_rade'])
+    esi_value = esi(p['pl_rade'], density(mass, p['pl_rade']), temp)
+    adams = adams_score(temp, p['pl_orbper'])
+
+    scores = {
+        'ESI': esi_value,
+        'insolation': flux,
+        'v_esc': v_esc,
+        'Adams_Score': adams,
+        'AstroBiom_Score': esi_value * 10 + adams,
+    }
+    codes = {
+        'habitable_type': habitability_codes(flux, inner, outer),
+        'Bio_Class': bio_codes(temp),
+        'Atmosphere_Class': atmosphere_codes(v_esc, flux),
+        'Adams_Category': adams_codes(adams),
+    }
+    return scores, codes
+
+
+def summarize_chunk(inputs, samples, seed):
+    rng = np.random.default_rng(seed)
+    scores, codes = simulate(inputs, samples, rng)
+
+    out = {}
+    for name, values in scores.items():
+        for q, row in zip(PERCENTILES, np.percentile(values, PERCENTILES, axis=1)):
+            out[f"{name}_p{q}"] = row
+    for column, labels in CLASSES.items():
+        for code, label in enumerate(labels):
+            out[f"P({label})"] = (codes[column] == code).mean(axis=1)
+    return out
+
+
+def propagate(df_raw, samples=1000, workers=None, seed=0, chunk_elements=CHUNK_ELEMENTS):
+    keep = kept_rows(df_raw)
+    df = df_raw[keep]
+
+    inputs = {}
+    for col in PARAMETERS:
+        inputs[col] = df[col].to_numpy(dtype=float)
+        for suffix in ('err1', 'err2'):
+            name = col + suffix
+            inputs[name] = df[name].to_numpy(dtype=float) if name in df.columns else np.zeros(len(df))
+
+    step = max(1, chunk_elements // samples)
+    bounds = range(0, len(df), step)
+    seeds = np.random.SeedSequence(seed).spawn(len(bounds))
+    chunks = [{name: values[start:start + step] for name, values in inputs.items()} for start in bounds]
+
+    if workers == 1 or len(chunks) <= 1:
+        parts = [summarize_chunk(chunk, samples, s) for chunk, s in zip(chunks, seeds)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(summarize_chunk, chunks, [samples] * len(chunks), seeds))
+
+    result = pd.DataFrame({'pl_name': df['pl_name'].to_numpy()}, index=df.index)
+    if parts:
+        for name in parts[0]:
+            result[name] = np.concatenate([part[name] for part in parts])
+    return result
+
+
+def run(samples=1000, workers=None, seed=0, csv=False):
+    if not dataset_exists(RAW_FILE):
+        print("Error: 'astrobiom_data' dataset not found")
+        return None
+
+    df_raw = load_dataset(RAW_FILE)
+    start = time.perf_counter()
+    result = propagate(df_raw, samples=samples, workers=workers, seed=seed)
+    elapsed = time.perf_counter() - start
+    print(f"Uncertainty: {len(result)} planets x {samples} samples in {elapsed:.1f} s.")
+
+    save_dataset(result, UNCERTAINTY_FILE, csv=csv)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monte Carlo uncertainty of the AstroBiom scores")
+    parser.add_argument("--samples", type=int, default=1000, help="draws per planet")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--csv", action="store_true", help="also write a CSV copy")
+    args = parser.parse_args()
+
+    run(samples=args.samples, workers=args.workers, seed=args.seed, csv=args.csv)